@@ -1,3 +1,13 @@
+import time
+import typing
+
+from app.common import metrics
+from databases import Database
+from databases.backends.mysql import MySQLBackend
+from databases.backends.mysql import MySQLConnection
+from sqlalchemy.engine.interfaces import Dialect
+
+
 def dsn(
     db_driver: str,
     db_host: str,
@@ -7,3 +17,66 @@ def dsn(
     db_name: str,
 ) -> str:
     return f"{db_driver}://{db_user}:{db_pass}@{db_host}:{db_port}/{db_name}"
+
+
+class TimedMySQLConnection(MySQLConnection):
+    def __init__(self, database: "TimedMySQLBackend", dialect: Dialect) -> None:
+        super().__init__(database, dialect)
+        self._timed_database = database
+        self._acquired_at: float | None = None
+
+    async def acquire(self) -> None:
+        requested_at = time.perf_counter()
+        self._timed_database.waiting += 1
+        try:
+            await super().acquire()
+        finally:
+            self._timed_database.waiting -= 1
+
+        self._acquired_at = time.perf_counter()
+        self._timed_database.checked_out += 1
+        metrics.observe(
+            "db.pool.wait_time_ms",
+            (self._acquired_at - requested_at) * 1e3,
+        )
+
+    async def release(self) -> None:
+        await super().release()
+
+        assert self._acquired_at is not None
+        self._timed_database.checked_out -= 1
+        metrics.observe(
+            "db.pool.checkout_time_ms",
+            (time.perf_counter() - self._acquired_at) * 1e3,
+        )
+        self._acquired_at = None
+
+
+class TimedMySQLBackend(MySQLBackend):
+    """The aiomysql backend, measuring how long connections are waited on
+    and held for, and how many are in use."""
+
+    def __init__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+        self.checked_out = 0
+
+    async def connect(self) -> None:
+        await super().connect()
+        metrics.register_gauge("db.pool.waiting", lambda: self.waiting)
+        metrics.register_gauge("db.pool.checked_out", lambda: self.checked_out)
+
+    async def disconnect(self) -> None:
+        metrics.unregister_gauge("db.pool.waiting")
+        metrics.unregister_gauge("db.pool.checked_out")
+        await super().disconnect()
+
+    def connection(self) -> TimedMySQLConnection:
+        return TimedMySQLConnection(self, self._dialect)
+
+
+class TimedDatabase(Database):
+    SUPPORTED_BACKENDS = {
+        **Database.SUPPORTED_BACKENDS,
+        "mysql": "app.adapters.database:TimedMySQLBackend",
+    }
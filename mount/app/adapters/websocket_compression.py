@@ -0,0 +1,101 @@
+import time
+import typing
+
+from app.common import settings
+from uvicorn.protocols.websockets.websockets_impl import (
+    WebSocketProtocol as _WebSocketProtocol,
+)
+from websockets import frames
+from websockets.extensions.base import Extension
+from websockets.extensions.permessage_deflate import PerMessageDeflate
+from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
+from websockets.legacy.framing import Frame
+from websockets.typing import ExtensionParameter
+
+
+class ThresholdPerMessageDeflate(PerMessageDeflate):
+    """permessage-deflate which sends messages under `min_size` bytes as-is.
+
+    RFC 7692 allows any message to be sent uncompressed (with RSV1 unset),
+    and the compressor's state (the context shared with the client) is left
+    untouched by those, so nothing needs negotiating with the client.
+    """
+
+    def __init__(self, *args: typing.Any, min_size: int, **kwargs: typing.Any):
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+
+    def encode(self, frame: frames.Frame) -> frames.Frame:
+        # only unfragmented messages; a fragmented message's continuation
+        # frames have to be treated the same as its first frame was
+        if (
+            frame.opcode in (frames.OP_TEXT, frames.OP_BINARY)
+            and frame.fin
+            and len(frame.data) < self.min_size
+        ):
+            return frame
+
+        return super().encode(frame)
+
+
+class ServerThresholdPerMessageDeflateFactory(ServerPerMessageDeflateFactory):
+    def __init__(self, *args: typing.Any, min_size: int, **kwargs: typing.Any):
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+
+    def process_request_params(
+        self,
+        params: typing.Sequence[ExtensionParameter],
+        accepted_extensions: typing.Sequence[Extension],
+    ) -> tuple[list[ExtensionParameter], PerMessageDeflate]:
+        response_params, extension = super().process_request_params(
+            params,
+            accepted_extensions,
+        )
+        return response_params, ThresholdPerMessageDeflate(
+            extension.remote_no_context_takeover,
+            extension.local_no_context_takeover,
+            extension.remote_max_window_bits,
+            extension.local_max_window_bits,
+            extension.compress_settings,
+            min_size=self.min_size,
+        )
+
+
+def make_extension_factory() -> ServerThresholdPerMessageDeflateFactory:
+    return ServerThresholdPerMessageDeflateFactory(
+        server_no_context_takeover=not settings.WS_COMPRESSION_CONTEXT_TAKEOVER,
+        client_no_context_takeover=not settings.WS_COMPRESSION_CONTEXT_TAKEOVER,
+        server_max_window_bits=settings.WS_COMPRESSION_SERVER_MAX_WINDOW_BITS,
+        client_max_window_bits=settings.WS_COMPRESSION_CLIENT_MAX_WINDOW_BITS,
+        compress_settings={"memLevel": settings.WS_COMPRESSION_MEMORY_LEVEL},
+        min_size=settings.WS_COMPRESSION_MIN_SIZE,
+    )
+
+
+# scope key under which the time (`time.monotonic()`) the client last
+# answered a protocol-level ping is kept
+LAST_PONG_SCOPE_KEY = "last_pong"
+
+
+class WebSocketProtocol(_WebSocketProtocol):
+    """uvicorn's websockets implementation, with our permessage-deflate
+    settings in place of its all-or-nothing defaults.
+
+    Pongs never reach the app through ASGI, so the time of the last one is
+    left in the connection's scope instead.
+    """
+
+    def __init__(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        super().__init__(*args, **kwargs)
+
+        if settings.WS_COMPRESSION_ENABLED:
+            self.available_extensions = [make_extension_factory()]
+        else:
+            self.available_extensions = []
+
+    async def read_frame(self, max_size: int | None) -> Frame:
+        frame = await super().read_frame(max_size)
+        if frame.opcode == frames.OP_PONG:
+            self.scope[LAST_PONG_SCOPE_KEY] = time.monotonic()  # type: ignore
+        return frame
@@ -1,22 +1,38 @@
-import time
+import asyncio
 
 import aioredis
-import databases
 from aiobotocore.session import get_session
 from app.adapters.database import dsn
+from app.adapters.database import TimedDatabase
+from app.api.context import AppContext
+from app.api.middlewares import RequestStateMiddleware
 from app.api.rest import router as rest_router
+from app.api.websocket import heartbeats
+from app.api.websocket import receipts
 from app.api.websocket import router as websocket_router
+from app.api.websocket.broker import ChatBroker
+from app.common import cache
 from app.common import logger
 from app.common import settings
+from app.common import snowflake
+from app.common.security import PASSWORD_HASHER
+from app.repositories.accounts import ACCOUNT_CACHE
+from app.repositories.accounts import AccountsRepo
+from app.repositories.room_members import ACCOUNT_ROOMS_CACHE
+from app.repositories.room_members import RoomMembersRepo
+from app.repositories.sessions import SESSION_CACHE
+from app.repositories.sessions import SessionsRepo
+from app.usecases import avatars
+from app.usecases import chat_messages
+from app.usecases import sessions
 from fastapi import FastAPI
-from fastapi import Request
 from fastapi.middleware.cors import CORSMiddleware
 
 
 def init_db(api: FastAPI) -> None:
     @api.on_event("startup")
     async def startup_db() -> None:
-        database = databases.Database(
+        database = TimedDatabase(
             dsn(
                 db_driver=settings.DB_DRIVER,
                 db_host=settings.DB_HOST,
@@ -74,35 +90,197 @@ def init_s3_client(api: FastAPI) -> None:
         del api.state.s3_client
 
 
+def init_chat_broker(api: FastAPI) -> None:
+    @api.on_event("startup")
+    async def startup_chat_broker() -> None:
+        broker = ChatBroker(api.state.redis)
+        await broker.start()
+        api.state.chat_broker = broker
+        logger.info("Chat broker started up", node_id=broker.node_id)
+
+    @api.on_event("shutdown")
+    async def shutdown_chat_broker() -> None:
+        await api.state.chat_broker.stop()
+        del api.state.chat_broker
+        logger.info("Chat broker shut down")
+
+
+def init_heartbeats(api: FastAPI) -> None:
+    @api.on_event("startup")
+    async def startup_heartbeats() -> None:
+        # otherwise quiet clients would time out between pings
+        if settings.CHAT_IDLE_TIMEOUT <= settings.CHAT_PING_INTERVAL:
+            raise ValueError("CHAT_IDLE_TIMEOUT must exceed CHAT_PING_INTERVAL")
+
+        heartbeats.HEARTBEATS.start()
+        logger.info(
+            "Heartbeats started up",
+            ping_interval=settings.CHAT_PING_INTERVAL,
+            idle_timeout=settings.CHAT_IDLE_TIMEOUT,
+        )
+
+    @api.on_event("shutdown")
+    async def shutdown_heartbeats() -> None:
+        await heartbeats.HEARTBEATS.stop()
+        logger.info("Heartbeats shut down")
+
+
+def init_session_cache(api: FastAPI) -> None:
+    @api.on_event("startup")
+    async def startup_session_cache() -> None:
+        if not settings.SESSION_CACHE_ENABLED:
+            return
+
+        api.state.session_cache_invalidator = asyncio.create_task(
+            cache.invalidate_forever(
+                api.state.redis,
+                channel=SessionsRepo.INVALIDATION_CHANNEL,
+                cache=SESSION_CACHE,
+            )
+        )
+        logger.info("Session cache started up")
+
+    @api.on_event("shutdown")
+    async def shutdown_session_cache() -> None:
+        if not settings.SESSION_CACHE_ENABLED:
+            return
+
+        api.state.session_cache_invalidator.cancel()
+        del api.state.session_cache_invalidator
+        logger.info("Session cache shut down")
+
+
+def init_account_cache(api: FastAPI) -> None:
+    @api.on_event("startup")
+    async def startup_account_cache() -> None:
+        if not settings.ACCOUNT_CACHE_ENABLED:
+            return
+
+        api.state.account_cache_invalidator = asyncio.create_task(
+            cache.invalidate_forever(
+                api.state.redis,
+                channel=AccountsRepo.INVALIDATION_CHANNEL,
+                cache=ACCOUNT_CACHE,
+            )
+        )
+        logger.info("Account cache started up")
+
+    @api.on_event("shutdown")
+    async def shutdown_account_cache() -> None:
+        if not settings.ACCOUNT_CACHE_ENABLED:
+            return
+
+        api.state.account_cache_invalidator.cancel()
+        del api.state.account_cache_invalidator
+        logger.info("Account cache shut down")
+
+
+def init_room_cache(api: FastAPI) -> None:
+    @api.on_event("startup")
+    async def startup_room_cache() -> None:
+        api.state.room_cache_invalidator = asyncio.create_task(
+            cache.invalidate_forever(
+                api.state.redis,
+                channel=RoomMembersRepo.ACCOUNT_INVALIDATION_CHANNEL,
+                cache=ACCOUNT_ROOMS_CACHE,
+            )
+        )
+        logger.info("Room cache started up")
+
+    @api.on_event("shutdown")
+    async def shutdown_room_cache() -> None:
+        api.state.room_cache_invalidator.cancel()
+        del api.state.room_cache_invalidator
+        logger.info("Room cache shut down")
+
+
+def init_session_expiry(api: FastAPI) -> None:
+    @api.on_event("startup")
+    async def startup_session_expiry() -> None:
+        ctx = AppContext(api)
+        sessions.SESSION_REFRESHER.start(ctx)
+        api.state.session_reaper = asyncio.create_task(sessions.reap_forever(ctx))
+        logger.info("Session expiry started up")
+
+    @api.on_event("shutdown")
+    async def shutdown_session_expiry() -> None:
+        api.state.session_reaper.cancel()
+        del api.state.session_reaper
+        await sessions.SESSION_REFRESHER.stop()
+        logger.info("Session expiry shut down")
+
+
+def init_chat_message_writer(api: FastAPI) -> None:
+    @api.on_event("startup")
+    async def startup_chat_message_writer() -> None:
+        # refuses to start up if every worker id is taken, rather than
+        # generating ids which could collide with another process'
+        api.state.worker_id_lease = snowflake.WorkerIdLease(
+            api.state.redis,
+            chat_messages.CHAT_MESSAGE_IDS,
+            ttl=settings.SNOWFLAKE_WORKER_ID_TTL,
+        )
+        worker_id = await api.state.worker_id_lease.acquire()
+        api.state.worker_id_lease.start()
+        chat_messages.CHAT_MESSAGE_WRITER.start(AppContext(api))
+        logger.info("Chat message writer started up", worker_id=worker_id)
+
+    @api.on_event("shutdown")
+    async def shutdown_chat_message_writer() -> None:
+        await chat_messages.CHAT_MESSAGE_WRITER.stop()
+        await api.state.worker_id_lease.stop()
+        del api.state.worker_id_lease
+        logger.info("Chat message writer shut down")
+
+
+def init_read_receipts(api: FastAPI) -> None:
+    @api.on_event("startup")
+    async def startup_read_receipts() -> None:
+        receipts.READ_CURSORS.start(AppContext(api))
+        logger.info("Read receipts started up")
+
+    @api.on_event("shutdown")
+    async def shutdown_read_receipts() -> None:
+        await receipts.READ_CURSORS.stop()
+        logger.info("Read receipts shut down")
+
+
+def init_password_hasher(api: FastAPI) -> None:
+    @api.on_event("startup")
+    async def startup_password_hasher() -> None:
+        PASSWORD_HASHER.start()
+        logger.info(
+            "Password hasher started up",
+            executor_type=PASSWORD_HASHER.executor_type,
+            max_workers=PASSWORD_HASHER.max_workers,
+        )
+
+    @api.on_event("shutdown")
+    async def shutdown_password_hasher() -> None:
+        PASSWORD_HASHER.stop()
+        logger.info("Password hasher shut down")
+
+
+def init_avatar_resizer(api: FastAPI) -> None:
+    @api.on_event("startup")
+    async def startup_avatar_resizer() -> None:
+        avatars.AVATAR_RESIZER.start()
+        logger.info(
+            "Avatar resizer started up",
+            executor_type=avatars.AVATAR_RESIZER.executor_type,
+            max_workers=avatars.AVATAR_RESIZER.max_workers,
+        )
+
+    @api.on_event("shutdown")
+    async def shutdown_avatar_resizer() -> None:
+        avatars.AVATAR_RESIZER.stop()
+        logger.info("Avatar resizer shut down")
+
+
 def init_middlewares(api: FastAPI) -> None:
     # NOTE: these run bottom to top
 
-    @api.middleware("http")
-    async def add_db_to_request(request: Request, call_next):
-        async with request.app.state.db.connection() as conn:
-            request.state.db = conn
-            response = await call_next(request)
-        return response
-
-    @api.middleware("http")
-    async def add_redis_to_request(request: Request, call_next):
-        request.state.redis = request.app.state.redis
-        response = await call_next(request)
-        return response
-
-    @api.middleware("http")
-    async def add_s3_client_to_request(request: Request, call_next):
-        request.state.s3_client = request.app.state.s3_client
-        response = await call_next(request)
-        return response
-
-    @api.middleware("http")
-    async def add_process_time_header(request: Request, call_next):
-        start_time = time.perf_counter_ns()
-        response = await call_next(request)
-        process_time = (time.perf_counter_ns() - start_time) / 1e6
-        response.headers["X-Process-Time"] = str(process_time)  # ms
-        return response
+    api.add_middleware(RequestStateMiddleware)
 
     # TODO: staging/production origins
     CORS_ORIGINS = [
@@ -130,7 +308,21 @@ def init_api() -> FastAPI:
     init_db(api)
     init_redis(api)
     init_s3_client(api)
+    init_chat_broker(api)
+    init_heartbeats(api)
+    init_session_cache(api)
+    init_account_cache(api)
+    init_room_cache(api)
+    init_session_expiry(api)
+    init_chat_message_writer(api)
+    init_read_receipts(api)
+    init_password_hasher(api)
+    init_avatar_resizer(api)
     init_middlewares(api)
     init_routes(api)
 
+    # tear things down in the reverse order they were set up in, so that
+    # e.g. background writers get to flush before the db & redis pools close
+    api.router.on_shutdown.reverse()
+
     return api
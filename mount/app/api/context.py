@@ -1,10 +1,39 @@
+import typing
+
 from aiobotocore.client import AioBaseClient
 from aioredis import Redis
 from app.common.context import Context
 from databases import Database
+from fastapi import FastAPI
 from fastapi import Request
 from fastapi import WebSocket
 
+if typing.TYPE_CHECKING:
+    from app.api.websocket.broker import ChatBroker
+
+
+class AppContext(Context):
+    """Context for work done outside of any request, e.g. background tasks."""
+
+    def __init__(self, app: FastAPI) -> None:
+        self.app = app
+
+    @property
+    def db(self) -> Database:
+        return self.app.state.db
+
+    @property
+    def redis(self) -> Redis:
+        return self.app.state.redis
+
+    @property
+    def s3_client(self) -> AioBaseClient:
+        return self.app.state.s3_client
+
+    @property
+    def chat_broker(self) -> "ChatBroker":
+        return self.app.state.chat_broker
+
 
 class HTTPRequestContext(Context):
     def __init__(self, request: Request) -> None:
@@ -12,7 +41,10 @@ class HTTPRequestContext(Context):
 
     @property
     def db(self) -> Database:
-        return self.request.state.db
+        # connections are checked out of the pool per query (or transaction)
+        # rather than per request, so requests that never touch mysql, or
+        # spend most of their time elsewhere, don't hold one
+        return self.request.app.state.db
 
     @property
     def redis(self) -> Redis:
@@ -22,6 +54,10 @@ class HTTPRequestContext(Context):
     def s3_client(self) -> AioBaseClient:
         return self.request.state.s3_client
 
+    @property
+    def chat_broker(self) -> "ChatBroker":
+        return self.request.app.state.chat_broker
+
 
 class WebSocketRequestContext(Context):
     def __init__(self, websocket: WebSocket) -> None:
@@ -38,3 +74,7 @@ class WebSocketRequestContext(Context):
     @property
     def s3_client(self) -> AioBaseClient:
         return self.websocket.app.state.s3_client
+
+    @property
+    def chat_broker(self) -> "ChatBroker":
+        return self.websocket.app.state.chat_broker
@@ -0,0 +1,42 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+
+class RequestStateMiddleware:
+    """Puts the app's redis & s3 clients on `request.state`, and adds the
+    time taken to start the response (in ms) as `X-Process-Time`.
+
+    A plain ASGI middleware rather than `@app.middleware("http")`, which
+    runs each request in a task of its own & pipes the response body
+    through a memory stream, once per middleware.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        app_state = scope["app"].state
+        state = scope.setdefault("state", {})
+        state["redis"] = app_state.redis
+        state["s3_client"] = app_state.s3_client
+
+        start_time = time.perf_counter_ns()
+
+        async def send_with_process_time(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                process_time = (time.perf_counter_ns() - start_time) / 1e6
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Process-Time", str(process_time))  # ms
+            await send(message)
+
+        await self.app(scope, receive, send_with_process_time)
@@ -2,6 +2,9 @@ from fastapi import APIRouter
 
 from . import accounts
 from . import avatars
+from . import conversations
+from . import metrics
+from . import rooms
 from . import sessions
 
 router = APIRouter()
@@ -10,3 +13,6 @@ router = APIRouter()
 router.include_router(accounts.router, tags=["Accounts"])
 router.include_router(avatars.router, tags=["Avatars"])
 router.include_router(sessions.router, tags=["Sessions"])
+router.include_router(conversations.router, tags=["Conversations"])
+router.include_router(rooms.router, tags=["Rooms"])
+router.include_router(metrics.router, tags=["Metrics"])
@@ -41,7 +41,7 @@ async def set_avatar(
             status_code=status.HTTP_403_FORBIDDEN,
         )
 
-    session = await sessions.fetch_one(ctx, session_id=http_credentials.credentials)
+    session = await sessions.authenticate(ctx, session_id=http_credentials.credentials)
     if session is None:
         data = ServiceError.SESSIONS_NOT_FOUND
         return responses.failure(
@@ -122,7 +122,7 @@ async def delete_avatar(
             status_code=status.HTTP_403_FORBIDDEN,
         )
 
-    session = await sessions.fetch_one(ctx, session_id=http_credentials.credentials)
+    session = await sessions.authenticate(ctx, session_id=http_credentials.credentials)
     if session is None:
         data = ServiceError.SESSIONS_NOT_FOUND
         return responses.failure(
@@ -0,0 +1,108 @@
+from app.api.context import HTTPRequestContext
+from app.api.rest import responses
+from app.api.rest.authentication import HTTPAuthorizationCredentials
+from app.api.rest.authentication import HTTPBearer
+from app.api.rest.responses import Success
+from app.common import logger
+from app.common.errors import ServiceError
+from app.models.chat_messages import ChatMessage
+from app.models.chat_messages import UnreadCount
+from app.usecases import chat_messages
+from app.usecases import sessions
+from fastapi import APIRouter
+from fastapi import Depends
+from fastapi import Query
+from fastapi import status
+
+http_scheme = HTTPBearer(auto_error=False)
+router = APIRouter()
+
+
+def get_status_code(error: ServiceError) -> int:
+    if error is ServiceError.SESSIONS_NOT_FOUND:
+        return status.HTTP_403_FORBIDDEN
+    else:
+        logger.error("Unhandled service error: ", error=error)
+        return status.HTTP_500_INTERNAL_SERVER_ERROR
+
+
+@router.get(
+    "/v1/conversations/{account_id}/messages",
+    response_model=Success[list[ChatMessage]],
+)
+async def fetch_messages(
+    account_id: int,
+    before: int | None = None,
+    limit: int = Query(50, ge=1, le=100),
+    http_credentials: HTTPAuthorizationCredentials | None = Depends(
+        http_scheme),
+    ctx: HTTPRequestContext = Depends(),
+):
+    if http_credentials is None:
+        return responses.failure(
+            error=ServiceError.SESSIONS_NOT_FOUND,
+            message="Failed to authenticate user",
+            status_code=status.HTTP_403_FORBIDDEN,
+        )
+
+    session = await sessions.authenticate(ctx, session_id=http_credentials.credentials)
+    if isinstance(session, ServiceError):
+        return responses.failure(
+            error=session,
+            message="Failed to authenticate user",
+            status_code=get_status_code(session),
+        )
+
+    # the conversation between the current user and `account_id`
+    data = await chat_messages.fetch_conversation(
+        ctx,
+        account_id=session["account_id"],
+        other_account_id=account_id,
+        before=before,
+        limit=limit,
+    )
+    if isinstance(data, ServiceError):
+        return responses.failure(
+            error=data,
+            message="Failed to fetch messages",
+            status_code=get_status_code(data),
+        )
+
+    resp = [ChatMessage.from_mapping(rec) for rec in data]
+    return responses.success(resp)
+
+
+@router.get("/v1/conversations/unread", response_model=Success[list[UnreadCount]])
+async def fetch_unread_counts(
+    http_credentials: HTTPAuthorizationCredentials | None = Depends(
+        http_scheme),
+    ctx: HTTPRequestContext = Depends(),
+):
+    if http_credentials is None:
+        return responses.failure(
+            error=ServiceError.SESSIONS_NOT_FOUND,
+            message="Failed to authenticate user",
+            status_code=status.HTTP_403_FORBIDDEN,
+        )
+
+    session = await sessions.authenticate(ctx, session_id=http_credentials.credentials)
+    if isinstance(session, ServiceError):
+        return responses.failure(
+            error=session,
+            message="Failed to authenticate user",
+            status_code=get_status_code(session),
+        )
+
+    data = await chat_messages.fetch_unread_counts(
+        ctx,
+        account_id=session["account_id"],
+    )
+    if isinstance(data, ServiceError):
+        return responses.failure(
+            error=data,
+            message="Failed to fetch unread counts",
+            status_code=get_status_code(data),
+        )
+
+    resp = [UnreadCount.from_mapping(rec) for rec in data]
+    return responses.success(resp)
@@ -0,0 +1,15 @@
+import typing
+
+from app.api.rest import responses
+from app.api.rest.responses import Success
+from app.common import metrics
+from fastapi import APIRouter
+from fastapi import status
+
+router = APIRouter()
+
+
+@router.get("/v1/metrics", response_model=Success[dict[str, typing.Any]])
+async def fetch_metrics():
+    resp = metrics.snapshot()
+    return responses.success(resp, status_code=status.HTTP_200_OK)
@@ -0,0 +1,190 @@
+from app.api.context import HTTPRequestContext
+from app.api.rest import responses
+from app.api.rest.authentication import HTTPAuthorizationCredentials
+from app.api.rest.authentication import HTTPBearer
+from app.api.rest.responses import Success
+from app.common import logger
+from app.common.errors import ServiceError
+from app.models.rooms import CreateRoomForm
+from app.models.rooms import Room
+from app.models.rooms import RoomMember
+from app.usecases import rooms
+from app.usecases import sessions
+from fastapi import APIRouter
+from fastapi import Depends
+from fastapi import status
+
+http_scheme = HTTPBearer(auto_error=False)
+router = APIRouter()
+
+
+def get_status_code(error: ServiceError) -> int:
+    if error in (ServiceError.SESSIONS_NOT_FOUND, ServiceError.ROOM_MEMBERS_FORBIDDEN):
+        return status.HTTP_403_FORBIDDEN
+    elif error is ServiceError.ROOMS_NAME_INVALID:
+        return status.HTTP_400_BAD_REQUEST
+    elif error in (
+        ServiceError.ROOMS_NOT_FOUND,
+        ServiceError.ROOM_MEMBERS_NOT_FOUND,
+        ServiceError.ACCOUNTS_NOT_FOUND,
+    ):
+        return status.HTTP_404_NOT_FOUND
+    elif error in (
+        ServiceError.ROOMS_CREATION_FAILED,
+        ServiceError.ROOM_MEMBERS_CREATION_FAILED,
+    ):
+        return status.HTTP_500_INTERNAL_SERVER_ERROR
+    else:
+        logger.error("Unhandled service error: ", error=error)
+        return status.HTTP_500_INTERNAL_SERVER_ERROR
+
+
+@router.post("/v1/rooms", response_model=Success[Room])
+async def create_room(
+    args: CreateRoomForm,
+    http_credentials: HTTPAuthorizationCredentials | None = Depends(
+        http_scheme),
+    ctx: HTTPRequestContext = Depends(),
+):
+    if http_credentials is None:
+        return responses.failure(
+            error=ServiceError.SESSIONS_NOT_FOUND,
+            message="Failed to authenticate user",
+            status_code=status.HTTP_403_FORBIDDEN,
+        )
+
+    session = await sessions.authenticate(ctx, session_id=http_credentials.credentials)
+    if isinstance(session, ServiceError):
+        return responses.failure(
+            error=session,
+            message="Failed to authenticate user",
+            status_code=get_status_code(session),
+        )
+
+    data = await rooms.create(
+        ctx,
+        name=args.name,
+        owner_account_id=session["account_id"],
+    )
+    if isinstance(data, ServiceError):
+        return responses.failure(
+            error=data,
+            message="Failed to create room",
+            status_code=get_status_code(data),
+        )
+
+    # any of the owner's live connections start receiving the room's messages
+    await ctx.chat_broker.publish_membership(
+        room_id=data["id"],
+        account_id=session["account_id"],
+        joined=True,
+    )
+
+    resp = Room.from_mapping(data)
+    return responses.success(resp, status_code=status.HTTP_201_CREATED)
+
+
+@router.get("/v1/rooms/{room_id}", response_model=Success[Room])
+async def fetch_room(
+    room_id: int,
+    ctx: HTTPRequestContext = Depends(),
+):
+    data = await rooms.fetch_one(ctx, room_id=room_id)
+    if isinstance(data, ServiceError):
+        return responses.failure(
+            error=data,
+            message="Failed to fetch room",
+            status_code=get_status_code(data),
+        )
+
+    resp = Room.from_mapping(data)
+    return responses.success(resp)
+
+
+@router.put(
+    "/v1/rooms/{room_id}/members/{account_id}",
+    response_model=Success[RoomMember],
+)
+async def join_room(
+    room_id: int,
+    account_id: int,
+    http_credentials: HTTPAuthorizationCredentials | None = Depends(
+        http_scheme),
+    ctx: HTTPRequestContext = Depends(),
+):
+    if http_credentials is None:
+        return responses.failure(
+            error=ServiceError.SESSIONS_NOT_FOUND,
+            message="Failed to authenticate user",
+            status_code=status.HTTP_403_FORBIDDEN,
+        )
+
+    session = await sessions.authenticate(ctx, session_id=http_credentials.credentials)
+    if isinstance(session, ServiceError):
+        return responses.failure(
+            error=session,
+            message="Failed to authenticate user",
+            status_code=get_status_code(session),
+        )
+
+    data = await rooms.join(
+        ctx,
+        room_id=room_id,
+        account_id=account_id,
+        added_by_account_id=session["account_id"],
+    )
+    if isinstance(data, ServiceError):
+        return responses.failure(
+            error=data,
+            message="Failed to join room",
+            status_code=get_status_code(data),
+        )
+
+    await ctx.chat_broker.publish_membership(
+        room_id=room_id,
+        account_id=account_id,
+        joined=True,
+    )
+
+    resp = RoomMember.from_mapping(data)
+    return responses.success(resp)
+
+
+@router.delete("/v1/rooms/{room_id}/members", response_model=Success[RoomMember])
+async def leave_room(
+    room_id: int,
+    http_credentials: HTTPAuthorizationCredentials | None = Depends(
+        http_scheme),
+    ctx: HTTPRequestContext = Depends(),
+):
+    if http_credentials is None:
+        return responses.failure(
+            error=ServiceError.SESSIONS_NOT_FOUND,
+            message="Failed to authenticate user",
+            status_code=status.HTTP_403_FORBIDDEN,
+        )
+
+    session = await sessions.authenticate(ctx, session_id=http_credentials.credentials)
+    if isinstance(session, ServiceError):
+        return responses.failure(
+            error=session,
+            message="Failed to authenticate user",
+            status_code=get_status_code(session),
+        )
+
+    data = await rooms.leave(ctx, room_id=room_id, account_id=session["account_id"])
+    if isinstance(data, ServiceError):
+        return responses.failure(
+            error=data,
+            message="Failed to leave room",
+            status_code=get_status_code(data),
+        )
+
+    await ctx.chat_broker.publish_membership(
+        room_id=room_id,
+        account_id=session["account_id"],
+        joined=False,
+    )
+
+    resp = RoomMember.from_mapping(data)
+    return responses.success(resp)
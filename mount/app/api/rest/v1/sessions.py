@@ -132,3 +132,34 @@ async def logout(
 
     resp = Session.from_mapping(data)
     return responses.success(resp, status_code=status.HTTP_201_CREATED)
+
+
+@router.delete(
+    "/v1/accounts/{account_id}/sessions",
+    response_model=Success[list[Session]],
+)
+async def logout_all(
+    account_id: int,
+    http_credentials: HTTPAuthorizationCredentials | None = Depends(
+        http_scheme),
+    ctx: HTTPRequestContext = Depends(),
+):
+    if http_credentials is None:
+        return responses.failure(
+            error=ServiceError.SESSIONS_NOT_FOUND,
+            message="Failed to authenticate user",
+            status_code=status.HTTP_403_FORBIDDEN,
+        )
+
+    session = await sessions.authenticate(ctx, session_id=http_credentials.credentials)
+    if isinstance(session, ServiceError) or session["account_id"] != account_id:
+        return responses.failure(
+            error=ServiceError.SESSIONS_NOT_FOUND,
+            message="Failed to authenticate user",
+            status_code=status.HTTP_403_FORBIDDEN,
+        )
+
+    data = await sessions.logout_all(ctx, account_id=account_id)
+
+    resp = [Session.from_mapping(rec) for rec in data]
+    return responses.success(resp, status_code=status.HTTP_200_OK)
@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import asyncio
+import typing
+from collections import defaultdict
+from uuid import uuid4
+
+from aioredis import Redis
+from aioredis.client import PubSub
+from aioredis.exceptions import ConnectionError
+from app.api.websocket import responses
+from app.api.websocket.connections import Connection
+from app.api.websocket.responses import Frame
+from app.common import logger
+from app.common import metrics
+from app.common import settings
+
+RESUBSCRIBE_DELAY = 1.0  # seconds
+
+# publish a frame to an account's channel, & store its frames in the
+# account's offline list if nobody was subscribed to receive it
+PUBLISH_OR_STORE_SCRIPT = """\
+local num_subscribers = redis.call("PUBLISH", ARGV[1], ARGV[2])
+if num_subscribers == 0 then
+    redis.call("RPUSH", KEYS[1], unpack(ARGV, 5))
+    redis.call("LTRIM", KEYS[1], -tonumber(ARGV[3]), -1)
+    redis.call("EXPIRE", KEYS[1], ARGV[4])
+end
+return num_subscribers
+"""
+
+
+class ChatBroker:
+    """Delivers outbound frames to every connection of an account, regardless
+    of which process (or host) in the cluster it's connected to.
+
+    Each process subscribes to a redis channel per account which currently
+    has a connection to it, and publishes outbound frames to the target
+    account's channel. Frames are queued onto the connections owned by this
+    process directly, and the process' own publishes are ignored when
+    they're echoed back over pub/sub.
+
+    Frames sent to an account with no connections anywhere can optionally
+    be stored (in a capped, expiring redis list) until it next connects.
+
+    Rooms work the same way, with a channel per room: a frame sent to a room
+    is published once, and each process writes it to the connections of
+    the room's members which it owns; no process ever walks the full member
+    list. Membership changes are broadcast so that processes can start (or
+    stop) listening to a room for connections they already own.
+    """
+
+    MEMBERSHIPS_CHANNEL = "server:chat:memberships"
+
+    def __init__(self, redis: Redis) -> None:
+        self.redis = redis
+        self.node_id = uuid4().hex
+        self._origin = self.node_id.encode()
+        self.connections: dict[int, list[Connection]] = defaultdict(list)
+
+        # room id -> ids of the accounts with connections to us in the room
+        self.rooms: dict[int, set[int]] = {}
+        self._account_rooms: dict[int, set[int]] = {}
+
+        self._pubsub: PubSub | None = None
+        self._reader: asyncio.Task | None = None
+
+        self._publish_or_store = redis.register_script(PUBLISH_OR_STORE_SCRIPT)
+
+    @staticmethod
+    def make_channel(account_id: int) -> str:
+        return f"server:chat:accounts:{account_id}"
+
+    @staticmethod
+    def make_room_channel(room_id: int) -> str:
+        return f"server:chat:rooms:{room_id}"
+
+    @staticmethod
+    def make_offline_key(account_id: int) -> str:
+        return f"server:chat:offline:{account_id}"
+
+    async def start(self) -> None:
+        self._pubsub = self.redis.pubsub()
+
+        # the memberships channel is always subscribed to, so the pubsub
+        # connection is established before any websockets arrive
+        await self._pubsub.subscribe(self.MEMBERSHIPS_CHANNEL)
+
+        self._reader = asyncio.create_task(self._read_forever())
+
+        metrics.register_gauge("chat.connections", self._count_connections)
+        metrics.register_gauge("chat.rooms", lambda: len(self.rooms))
+        metrics.register_gauge("chat.send_queue.depth", self._total_queue_depth)
+        metrics.register_gauge("chat.send_queue.max_depth", self._max_queue_depth)
+
+    async def stop(self) -> None:
+        metrics.unregister_gauge("chat.connections")
+        metrics.unregister_gauge("chat.rooms")
+        metrics.unregister_gauge("chat.send_queue.depth")
+        metrics.unregister_gauge("chat.send_queue.max_depth")
+
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+
+        if self._pubsub is not None:
+            await self._pubsub.reset()
+            self._pubsub = None
+
+    def _iter_connections(self) -> typing.Iterator[Connection]:
+        for connections in self.connections.values():
+            yield from connections
+
+    def _count_connections(self) -> int:
+        return sum(len(connections) for connections in self.connections.values())
+
+    def _total_queue_depth(self) -> int:
+        return sum(conn.queue.qsize() for conn in self._iter_connections())
+
+    def _max_queue_depth(self) -> int:
+        return max((conn.queue.qsize() for conn in self._iter_connections()), default=0)
+
+    async def connect(
+        self,
+        connection: Connection,
+        room_ids: typing.Iterable[int] = (),
+    ) -> None:
+        assert self._pubsub is not None
+
+        local_connections = self.connections[connection.account_id]
+        local_connections.append(connection)
+
+        if len(local_connections) == 1:
+            await self._pubsub.subscribe(self.make_channel(connection.account_id))
+            await self._join_rooms(connection.account_id, room_ids)
+
+    async def disconnect(self, connection: Connection) -> None:
+        assert self._pubsub is not None
+
+        local_connections = self.connections.get(connection.account_id)
+        if local_connections is None or connection not in local_connections:
+            return
+
+        local_connections.remove(connection)
+
+        if not local_connections:
+            del self.connections[connection.account_id]
+            await self._pubsub.unsubscribe(self.make_channel(connection.account_id))
+            await self._leave_rooms(
+                connection.account_id,
+                list(self._account_rooms.get(connection.account_id, ())),
+            )
+
+    async def _join_rooms(
+        self,
+        account_id: int,
+        room_ids: typing.Iterable[int],
+    ) -> None:
+        assert self._pubsub is not None
+
+        new_channels = []
+        for room_id in room_ids:
+            members = self.rooms.get(room_id)
+            if members is None:
+                members = self.rooms[room_id] = set()
+                new_channels.append(self.make_room_channel(room_id))
+
+            members.add(account_id)
+            self._account_rooms.setdefault(account_id, set()).add(room_id)
+
+        if new_channels:
+            await self._pubsub.subscribe(*new_channels)
+
+    async def _leave_rooms(
+        self,
+        account_id: int,
+        room_ids: typing.Iterable[int],
+    ) -> None:
+        assert self._pubsub is not None
+
+        old_channels = []
+        for room_id in room_ids:
+            members = self.rooms.get(room_id)
+            if members is None or account_id not in members:
+                continue
+
+            members.remove(account_id)
+            if not members:
+                del self.rooms[room_id]
+                old_channels.append(self.make_room_channel(room_id))
+
+            account_rooms = self._account_rooms[account_id]
+            account_rooms.remove(room_id)
+            if not account_rooms:
+                del self._account_rooms[account_id]
+
+        if old_channels:
+            await self._pubsub.unsubscribe(*old_channels)
+
+    async def publish_membership(
+        self,
+        room_id: int,
+        account_id: int,
+        joined: bool,
+    ) -> None:
+        """Let every process know an account has joined (or left) a room."""
+        payload = b"%s%d:%d" % (b"+" if joined else b"-", room_id, account_id)
+        await self.redis.publish(self.MEMBERSHIPS_CHANNEL, payload)
+
+    async def send(
+        self,
+        account_id: int,
+        frame: Frame,
+        *,
+        store_if_offline: bool = False,
+    ) -> None:
+        await self.send_many(account_id, [frame], store_if_offline=store_if_offline)
+
+    async def send_many(
+        self,
+        account_id: int,
+        frames: list[Frame],
+        *,
+        store_if_offline: bool = False,
+    ) -> None:
+        """Send frames to an account as one websocket message (& one publish)."""
+        frame = responses.combine(frames)
+
+        # deliver to our own connections without a round trip through redis
+        self._deliver_local(account_id, frame)
+
+        # the frame is published pre-encoded, so that no process in the
+        # cluster needs to serialize it again for its own connections
+        payload = b"%s:%s" % (self._origin, frame.encoded)
+        if not store_if_offline:
+            await self.redis.publish(self.make_channel(account_id), payload)
+            return
+
+        # we subscribe to the channel of any account connected to us, so no
+        # subscribers means no connections in the whole cluster. publishing
+        # & storing happen atomically, so a connection subscribing in
+        # between can't miss the frames (see `fetch_offline`)
+        num_subscribers = await self._publish_or_store(
+            keys=[self.make_offline_key(account_id)],
+            args=[
+                self.make_channel(account_id),
+                payload,
+                settings.CHAT_OFFLINE_QUEUE_SIZE,
+                settings.CHAT_OFFLINE_QUEUE_TTL,
+                # stored individually; they're re-batched when replayed
+                *(frame.encoded for frame in frames),
+            ],
+        )
+        if num_subscribers == 0:
+            metrics.increment("chat.offline.stored", len(frames))
+
+    async def fetch_offline(self, account_id: int) -> list[bytes]:
+        """Fetch the (encoded) frames stored for an account while it was
+        offline, oldest first.
+
+        Called once the account's connection has subscribed, nothing more
+        can be stored for it after this (until it disconnects again). The
+        frames are left in place until `ack_offline`, so that any which
+        couldn't be replayed are kept for the next connection.
+        """
+        return await self.redis.lrange(self.make_offline_key(account_id), 0, -1)
+
+    async def ack_offline(self, account_id: int, count: int) -> None:
+        """Remove the oldest `count` stored frames, once they've been
+        replayed."""
+        if count == 0:
+            return
+
+        await self.redis.ltrim(self.make_offline_key(account_id), count, -1)
+        metrics.increment("chat.offline.replayed", count)
+
+    async def send_to_room(self, room_id: int, frame: Frame) -> None:
+        self._deliver_room(room_id, frame)
+
+        payload = b"%s:%s" % (self._origin, frame.encoded)
+        await self.redis.publish(self.make_room_channel(room_id), payload)
+
+    # deliveries never wait on a connection, so that one slow client can't
+    # hold up the rest (nor the pub/sub reader, for every client)
+
+    def _deliver_room(self, room_id: int, frame: Frame) -> None:
+        for account_id in self.rooms.get(room_id, ()):
+            self._deliver_local(account_id, frame)
+
+    def _deliver_local(self, account_id: int, frame: Frame) -> None:
+        for connection in self.connections.get(account_id, ()):
+            connection.deliver(frame)
+
+    async def _handle_membership(self, payload: bytes) -> None:
+        room_id, account_id = map(int, payload[1:].split(b":"))
+        if account_id not in self.connections:
+            return
+
+        if payload.startswith(b"+"):
+            await self._join_rooms(account_id, [room_id])
+        else:
+            await self._leave_rooms(account_id, [room_id])
+
+    async def _handle_message(self, message: dict[str, typing.Any]) -> None:
+        channel = message["channel"].decode()
+        if channel == self.MEMBERSHIPS_CHANNEL:
+            await self._handle_membership(message["data"])
+            return
+
+        _, kind, target_id = channel.rsplit(":", maxsplit=2)
+        origin, _, encoded = message["data"].partition(b":")
+        if origin == self._origin:
+            return
+
+        if kind == "rooms":
+            self._deliver_room(int(target_id), Frame(encoded=encoded))
+        elif kind == "accounts":
+            self._deliver_local(int(target_id), Frame(encoded=encoded))
+
+    async def _resubscribe(self) -> None:
+        assert self._pubsub is not None
+
+        await self._pubsub.reset()
+        await self._pubsub.subscribe(
+            self.MEMBERSHIPS_CHANNEL,
+            *(self.make_channel(account_id) for account_id in self.connections),
+            *(self.make_room_channel(room_id) for room_id in self.rooms),
+        )
+
+    async def _listen(self) -> None:
+        assert self._pubsub is not None
+
+        async for message in self._pubsub.listen():
+            if message["type"] != "message":
+                continue
+
+            try:
+                await self._handle_message(message)
+            except Exception as exc:
+                logger.error("Failed to handle chat message", error=exc)
+
+    async def _read_forever(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except ConnectionError as exc:
+                logger.warning("Lost chat broker connection", error=exc)
+
+            while True:
+                await asyncio.sleep(RESUBSCRIBE_DELAY)
+                try:
+                    await self._resubscribe()
+                except ConnectionError as exc:
+                    logger.warning("Failed to resubscribe chat broker", error=exc)
+                else:
+                    break
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from enum import Enum
+
+from app.adapters.websocket_compression import LAST_PONG_SCOPE_KEY
+from app.api.websocket.protocols import Protocol
+from app.api.websocket.responses import Frame
+from app.common import logger
+from app.common import metrics
+from app.common.timer_wheel import Timer
+from fastapi import status
+from fastapi import WebSocket
+
+
+class OverflowPolicy(str, Enum):
+    # discard the oldest queued frame to make room for the new one
+    DROP_OLDEST = "drop_oldest"
+    # close the connection; the client is too slow to keep up
+    DISCONNECT = "disconnect"
+    # there's deliberately no policy which makes senders wait for room: the
+    # broker fans out from a single task, which one slow client mustn't
+    # hold up for everyone else
+
+
+class Connection:
+    """A websocket with a bounded outbound queue, drained by its own writer
+    task, so that a slow or stalled client never blocks whoever is sending
+    to it; a full queue is dealt with by the overflow policy instead."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        account_id: int,
+        max_queue_size: int,
+        overflow_policy: OverflowPolicy,
+        protocol: Protocol = Protocol.JSON,
+        app_pings: bool = False,
+    ) -> None:
+        self.websocket = websocket
+        self.account_id = account_id
+        self.overflow_policy = overflow_policy
+        self.protocol = protocol
+        # whether the client asked to be sent PING packets, on top of the
+        # protocol-level pings every client gets
+        self.app_pings = app_pings
+        self.queue: asyncio.Queue[Frame] = asyncio.Queue(maxsize=max_queue_size)
+        self.dropped = 0
+        self.closed = False
+        # when we last heard anything from the client
+        self.last_seen = time.monotonic()
+        self.heartbeat: Timer | None = None
+        # deliveries held back while older frames are sent, so that none
+        # overtake them; see `hold`
+        self._held: list[Frame] | None = None
+
+        self._writer: asyncio.Task | None = None
+        self._closer: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._writer = asyncio.create_task(self._write_forever())
+
+    async def stop(self) -> None:
+        self._mark_closed()
+
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+
+    def _mark_closed(self) -> None:
+        self.closed = True
+
+        if self.heartbeat is not None:
+            self.heartbeat.cancel()
+            self.heartbeat = None
+
+        # nothing queued will be written now
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    def touch(self) -> None:
+        self.last_seen = time.monotonic()
+
+    def idle_for(self) -> float:
+        """Seconds since we last heard from the client, in a message or in
+        answer to a protocol-level ping."""
+        last_pong = self.websocket.scope.get(LAST_PONG_SCOPE_KEY, 0.0)
+        return time.monotonic() - max(self.last_seen, last_pong)
+
+    def send_nowait(self, frame: Frame) -> bool:
+        """Queue a frame if there's room, without ever waiting or applying
+        the overflow policy; returns whether it was queued."""
+        if self.closed or self._closer is not None:
+            return False
+
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def hold(self) -> None:
+        """Hold back deliveries (but not sends) until `release`; e.g. live
+        frames, while the frames stored for the client are replayed."""
+        self._held = []
+
+    def release(self) -> None:
+        held, self._held = self._held, None
+        for frame in held or ():
+            self._enqueue(frame)
+
+    def send(self, frame: Frame) -> None:
+        """Queue a frame from the connection's own handler (e.g. replaying
+        its offline frames), which isn't held back like deliveries are."""
+        if self.closed or self._closer is not None:
+            return
+
+        self._enqueue(frame)
+
+    def deliver(self, frame: Frame) -> None:
+        """Queue a frame fanned out by the broker, without ever waiting.
+
+        The broker delivers from a single task per worker, which one slow
+        client mustn't hold up for everyone else.
+        """
+        if self.closed or self._closer is not None:
+            return
+
+        if self._held is not None:
+            # held frames count against the queue's size, as they will be
+            if len(self._held) + self.queue.qsize() >= self.queue.maxsize:
+                self._overflowed()
+                if self.overflow_policy is not OverflowPolicy.DROP_OLDEST:
+                    self._disconnect_slow_consumer()
+                    return
+
+                if self._held:
+                    self._held.pop(0)
+                else:
+                    self.queue.get_nowait()
+
+            self._held.append(frame)
+            return
+
+        self._enqueue(frame)
+
+    def _enqueue(self, frame: Frame) -> None:
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self._overflowed()
+
+            if self.overflow_policy is OverflowPolicy.DROP_OLDEST:
+                self.queue.get_nowait()
+                self.queue.put_nowait(frame)
+            else:
+                self._disconnect_slow_consumer()
+
+    def _overflowed(self) -> None:
+        self.dropped += 1
+        metrics.increment("chat.send_queue.dropped")
+
+    def _disconnect_slow_consumer(self) -> None:
+        metrics.increment("chat.send_queue.disconnects")
+        logger.warning(
+            "Disconnecting slow websocket consumer",
+            account_id=self.account_id,
+            queue_size=self.queue.qsize(),
+        )
+        self.disconnect(code=status.WS_1013_TRY_AGAIN_LATER)
+
+    def disconnect(self, code: int) -> None:
+        # closing may block on a stalled socket; don't make the caller wait
+        # for it
+        if self._closer is None:
+            self._closer = asyncio.create_task(self._close(code))
+
+    async def _close(self, code: int) -> None:
+        await self.stop()
+        try:
+            await self.websocket.close(code=code)
+        except Exception as exc:  # already closed
+            logger.debug("Failed to close websocket", error=exc)
+
+    async def _write_forever(self) -> None:
+        while True:
+            frame = await self.queue.get()
+            try:
+                if self.protocol is Protocol.MSGPACK:
+                    await self.websocket.send_bytes(frame.msgpack)
+                else:
+                    await self.websocket.send_text(frame.text)
+            except Exception as exc:
+                # the receive loop will notice the disconnection & clean up
+                logger.debug("Failed to write to websocket", error=exc)
+                self._mark_closed()
+                return
@@ -0,0 +1,144 @@
+import typing
+
+from app.api.websocket import protocols
+from app.api.websocket.protocols import Protocol
+from app.common import settings
+from app.models import Batch
+from app.models import BaseModel
+from app.models import ClientMessages
+from app.models import Packet
+from app.models.chat_messages import MarkAsRead
+from app.models.chat_messages import SendChatMessage
+from app.models.chat_messages import SendRoomMessage
+from fastapi import status
+from fastapi import WebSocketException
+
+DecodedPacket = tuple[ClientMessages, dict[str, typing.Any]]
+
+PACKET_MODELS: dict[ClientMessages, type[BaseModel]] = {
+    ClientMessages.SEND_CHAT_MESSAGE: SendChatMessage,
+    ClientMessages.SEND_ROOM_MESSAGE: SendRoomMessage,
+    ClientMessages.MARK_AS_READ: MarkAsRead,
+}
+
+MESSAGE_TYPES = {message_type.value: message_type for message_type in ClientMessages}
+
+# the (name, type) of each field of each packet's data, read off the models
+# once at import so they can't drift apart
+PACKET_FIELDS: dict[ClientMessages, tuple[tuple[str, type], ...]] = {
+    message_type: tuple(
+        (name, PACKET_MODELS[message_type].__fields__[name].outer_type_)
+        for name in PACKET_MODELS[message_type].__fields__
+    )
+    if message_type in PACKET_MODELS
+    else ()
+    for message_type in ClientMessages
+}
+
+
+def _fast_envelope(obj: typing.Any) -> DecodedPacket | None:
+    if type(obj) is not dict:
+        return None
+
+    message_type = obj.get("message_type")
+    data = obj.get("data")
+    if type(message_type) is not str or type(data) is not dict:
+        return None
+
+    client_message = MESSAGE_TYPES.get(message_type)
+    if client_message is None:
+        return None
+
+    return client_message, data
+
+
+def _fast_data(
+    message_type: ClientMessages,
+    data: dict[str, typing.Any],
+) -> dict[str, typing.Any] | None:
+    values = {}
+    for name, type_ in PACKET_FIELDS[message_type]:
+        value = data.get(name)
+        # exact types only; pydantic's coercions are left to pydantic
+        if type(value) is not type_:
+            return None
+        values[name] = value.strip() if type_ is str else value
+    return values
+
+
+def _decode_fast(obj: typing.Any) -> list[DecodedPacket] | None:
+    envelope = _fast_envelope(obj)
+    if envelope is None:
+        return None
+
+    message_type, data = envelope
+    if message_type is ClientMessages.BATCH:
+        messages = data.get("messages")
+        if type(messages) is not list:
+            return None
+
+        envelopes = []
+        for message in messages:
+            envelope = _fast_envelope(message)
+            if envelope is None:
+                return None
+            envelopes.append(envelope)
+
+        if len(envelopes) > settings.CHAT_CLIENT_BATCH_MAX_SIZE:
+            raise WebSocketException(code=status.WS_1009_MESSAGE_TOO_BIG)
+    else:
+        envelopes = [envelope]
+
+    packets = []
+    for message_type, data in envelopes:
+        if message_type is ClientMessages.BATCH:
+            # batches don't nest
+            raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
+
+        values = _fast_data(message_type, data)
+        if values is None:
+            return None
+        packets.append((message_type, values))
+
+    return packets
+
+
+def _decode_slow(obj: typing.Any) -> list[DecodedPacket]:
+    packet = Packet(**obj)
+    if packet.message_type == ClientMessages.BATCH:
+        batch = Batch(**packet.data).messages
+        if len(batch) > settings.CHAT_CLIENT_BATCH_MAX_SIZE:
+            raise WebSocketException(code=status.WS_1009_MESSAGE_TOO_BIG)
+    else:
+        batch = [packet]
+
+    packets = []
+    for packet in batch:
+        if packet.message_type == ClientMessages.BATCH:
+            raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
+
+        model = PACKET_MODELS.get(packet.message_type)
+        data = model(**packet.data).dict() if model is not None else {}
+        packets.append((packet.message_type, data))
+
+    return packets
+
+
+def decode(
+    raw: str | bytes,
+    protocol: Protocol = Protocol.JSON,
+) -> list[DecodedPacket]:
+    """Decode a websocket message into the packets it carries, in order.
+
+    Well-formed packets are checked against plain type tests, without
+    building any models. Anything else (including everything pydantic
+    would coerce, or reject) goes through the models, so the results and
+    errors are the same either way.
+    """
+    obj = protocols.loads(protocol, raw)
+
+    packets = _decode_fast(obj)
+    if packets is None:
+        packets = _decode_slow(obj)
+
+    return packets
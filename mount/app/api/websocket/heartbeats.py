@@ -0,0 +1,72 @@
+import functools
+import time
+
+from app.api.websocket import responses
+from app.api.websocket.connections import Connection
+from app.common import logger
+from app.common import metrics
+from app.common import settings
+from app.common.timer_wheel import TimerWheel
+from fastapi import status
+from fastapi import WebSocket
+
+# one timer per connection, all on a single task per worker; a turn of the
+# wheel covers the idle timeout, so most timers fire on their first round
+HEARTBEATS = TimerWheel(
+    name="chat.heartbeats",
+    tick=1.0,
+    num_slots=max(int(settings.CHAT_IDLE_TIMEOUT) + 1, 1),
+)
+
+
+def _check(connection: Connection) -> None:
+    connection.heartbeat = None
+    if connection.closed:
+        return
+
+    idle = connection.idle_for()
+    if idle >= settings.CHAT_IDLE_TIMEOUT:
+        # half-open, or the client's stopped answering pings; either way
+        # it's gone, & shouldn't be counted as online any longer
+        metrics.increment("chat.heartbeats.timeouts")
+        logger.info(
+            "Disconnecting idle websocket",
+            account_id=connection.account_id,
+            idle=idle,
+        )
+        connection.disconnect(code=status.WS_1001_GOING_AWAY)
+        return
+
+    if idle >= settings.CHAT_PING_INTERVAL:
+        if connection.app_pings:
+            # a full queue means a write is already outstanding; the client
+            # will get to (or time out on) that instead
+            connection.send_nowait(responses.ping())
+        delay = settings.CHAT_IDLE_TIMEOUT - idle
+    else:
+        delay = settings.CHAT_PING_INTERVAL - idle
+
+    _schedule(connection, delay)
+
+
+def _schedule(connection: Connection, delay: float) -> None:
+    connection.heartbeat = HEARTBEATS.schedule(
+        delay,
+        functools.partial(_check, connection),
+    )
+
+
+def wants_app_pings(websocket: WebSocket) -> bool:
+    return websocket.query_params.get("pings") == "app"
+
+
+def watch(connection: Connection) -> None:
+    """Close the connection once it's been quiet for the idle timeout.
+
+    Anything received from the client (see `Connection.touch`) counts, as
+    do its answers to the protocol-level pings the server sends every ping
+    interval, which browsers send by themselves. Clients which connected
+    with `?pings=app` are also sent a PING packet whenever they've been
+    quiet for the ping interval, for those which can't see protocol pings.
+    """
+    _schedule(connection, settings.CHAT_PING_INTERVAL)
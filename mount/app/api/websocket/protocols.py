@@ -0,0 +1,30 @@
+import typing
+from enum import Enum
+
+import msgpack
+import orjson
+
+
+class Protocol(str, Enum):
+    """The wire formats a client can ask for, as a websocket subprotocol.
+
+    Clients which don't ask for one get JSON text frames.
+    """
+
+    JSON = "chat.json.v1"
+    MSGPACK = "chat.msgpack.v1"
+
+
+def negotiate(requested: list[str]) -> Protocol:
+    """Pick the first of the client's subprotocols (in its order of
+    preference) which we support."""
+    for subprotocol in requested:
+        if subprotocol in Protocol._value2member_map_:
+            return Protocol(subprotocol)
+    return Protocol.JSON
+
+
+def loads(protocol: Protocol, raw: str | bytes) -> typing.Any:
+    if protocol is Protocol.MSGPACK:
+        return msgpack.unpackb(raw)
+    return orjson.loads(raw)
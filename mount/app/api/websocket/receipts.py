@@ -0,0 +1,62 @@
+import typing
+
+from app.api.context import AppContext
+from app.api.websocket import responses
+from app.common import settings
+from app.common.batching import WriteBehindBuffer
+from app.common.context import Context
+from app.usecases import chat_messages
+
+
+async def _flush_read_cursors(
+    ctx: Context,
+    read_cursors: list[dict[str, typing.Any]],
+) -> None:
+    assert isinstance(ctx, AppContext)
+
+    advanced = await chat_messages.save_read_cursors(ctx, read_cursors)
+
+    # one receipt per conversation per flush, however many marks it took;
+    # none for marks of messages which had already been read
+    for read_cursor in advanced:
+        await ctx.chat_broker.send(
+            read_cursor["other_account_id"],
+            responses.read_receipt(
+                reader_account_id=read_cursor["account_id"],
+                message_id=read_cursor["last_read_message_id"],
+            ),
+        )
+
+
+def _merge_read_cursors(
+    pending: dict[str, typing.Any],
+    read_cursor: dict[str, typing.Any],
+) -> dict[str, typing.Any]:
+    # cursors only move forward, whatever order the marks arrive in
+    if read_cursor["last_read_message_id"] > pending["last_read_message_id"]:
+        return read_cursor
+    return pending
+
+
+# clients mark messages as read constantly while scrolling; only the
+# furthest mark per conversation is written (and receipted) each interval
+READ_CURSORS: WriteBehindBuffer[dict[str, typing.Any]] = WriteBehindBuffer(
+    name="chat.read_cursors",
+    flush=_flush_read_cursors,
+    max_size=1000,
+    interval=settings.CHAT_READ_CURSOR_FLUSH_INTERVAL,
+    merge=_merge_read_cursors,
+)
+
+
+def mark_as_read(account_id: int, other_account_id: int, message_id: int) -> None:
+    # if the buffer's full, the mark is turned away; the next one the client
+    # sends (as it reads further) supersedes it anyway
+    READ_CURSORS.add(
+        {
+            "account_id": account_id,
+            "other_account_id": other_account_id,
+            "last_read_message_id": message_id,
+        },
+        key=(account_id, other_account_id),
+    )
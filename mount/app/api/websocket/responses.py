@@ -0,0 +1,124 @@
+import typing
+
+import msgpack
+from app.common import json
+from app.models import ServerMessages
+
+
+class Frame:
+    """An outbound websocket message, serialized at most once per protocol
+    regardless of how many connections it ends up being written to."""
+
+    __slots__ = ("_message", "_encoded", "_text", "_msgpack")
+
+    def __init__(
+        self,
+        message: typing.Mapping[str, typing.Any] | None = None,
+        *,
+        encoded: bytes | None = None,
+    ) -> None:
+        assert message is not None or encoded is not None
+        self._message = message
+        self._encoded = encoded
+        self._text: str | None = None
+        self._msgpack: bytes | None = None
+
+    @property
+    def message(self) -> typing.Mapping[str, typing.Any]:
+        if self._message is None:
+            assert self._encoded is not None
+            self._message = json.loads(self._encoded)
+        return self._message
+
+    @property
+    def encoded(self) -> bytes:
+        if self._encoded is None:
+            self._encoded = json.dumps(self._message)
+        return self._encoded
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.encoded.decode()
+        return self._text
+
+    @property
+    def msgpack(self) -> bytes:
+        if self._msgpack is None:
+            self._msgpack = msgpack.packb(self.message)
+        return self._msgpack
+
+
+def accepted() -> Frame:
+    return Frame({"message_type": ServerMessages.ACCEPTED, "data": {}})
+
+
+# the same for everyone, so it's only ever serialized once per protocol
+_PING = Frame({"message_type": ServerMessages.PING, "data": {}})
+
+
+def ping() -> Frame:
+    return _PING
+
+
+def chat_message(
+    message_id: int,
+    message_content: str,
+    sender_account_id: int,
+) -> Frame:
+    return Frame(
+        {
+            "message_type": ServerMessages.SEND_CHAT_MESSAGE,
+            "data": {
+                "message_id": message_id,
+                "message_content": message_content,
+                "sender_account_id": sender_account_id,
+            },
+        }
+    )
+
+
+def room_message(
+    message_id: int,
+    message_content: str,
+    sender_account_id: int,
+    room_id: int,
+) -> Frame:
+    return Frame(
+        {
+            "message_type": ServerMessages.SEND_ROOM_MESSAGE,
+            "data": {
+                "message_id": message_id,
+                "message_content": message_content,
+                "sender_account_id": sender_account_id,
+                "room_id": room_id,
+            },
+        }
+    )
+
+
+def read_receipt(reader_account_id: int, message_id: int) -> Frame:
+    return Frame(
+        {
+            "message_type": ServerMessages.READ_RECEIPT,
+            "data": {
+                "reader_account_id": reader_account_id,
+                "message_id": message_id,
+            },
+        }
+    )
+
+
+def combine(frames: list[Frame]) -> Frame:
+    """Carry several frames to a connection in a single websocket message."""
+    if len(frames) == 1:
+        return frames[0]
+    return batch([frame.encoded for frame in frames])
+
+
+def batch(encoded_messages: list[bytes]) -> Frame:
+    # spliced together as-is, rather than decoded & re-encoded as a whole
+    return Frame(
+        encoded=b'{"message_type":"%s","data":{"messages":[%s]}}'
+        % (ServerMessages.BATCH.value.encode(), b",".join(encoded_messages))
+    )
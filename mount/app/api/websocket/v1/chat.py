@@ -1,14 +1,25 @@
+import asyncio
+import typing
 from collections import defaultdict
 from uuid import UUID
 
 from app.api.context import WebSocketRequestContext
+from app.api.websocket import decoding
+from app.api.websocket import heartbeats
+from app.api.websocket import protocols
+from app.api.websocket import receipts
+from app.api.websocket import responses
+from app.api.websocket.connections import Connection
+from app.api.websocket.connections import OverflowPolicy
+from app.api.websocket.decoding import DecodedPacket
+from app.api.websocket.protocols import Protocol
+from app.api.websocket.responses import Frame
 from app.common import logger
+from app.common import settings
 from app.common.errors import ServiceError
 from app.models import ClientMessages
-from app.models import Packet
-from app.models import ServerMessages
-from app.models.chat_messages import SendChatMessage
 from app.usecases import chat_messages
+from app.usecases import rooms
 from app.usecases import sessions
 from fastapi import APIRouter
 from fastapi import Depends
@@ -20,11 +31,120 @@ from fastapi import WebSocketException
 router = APIRouter()
 
 
-# TODO: responses module
+async def receive_message(websocket: WebSocket) -> str | bytes:
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message["code"])
 
-# TODO: track which hosts have which websockets in redis?
-# that way this could be distributed (i suppose)
-WEBSOCKETS: dict[int, list[WebSocket]] = defaultdict(list)
+    raw = message.get("text")
+    if raw is None:
+        raw = message["bytes"]
+    return raw
+
+
+async def handle_packets(
+    ctx: WebSocketRequestContext,
+    account_id: int,
+    packets: list[DecodedPacket],
+) -> bool:
+    """Handle the (already validated) packets from a single websocket
+    message, in order.
+
+    Outgoing messages are grouped by recipient (or room), so that each gets
+    one websocket message however many the packets were addressed to it.
+    Returns whether the client asked to log out.
+    """
+    outgoing: list[dict[str, typing.Any]] = []
+    logged_out = False
+    for message_type, data in packets:
+        if message_type is ClientMessages.SEND_CHAT_MESSAGE:
+            outgoing.append(
+                {
+                    "recipient_account_id": data["target_account_id"],
+                    "message_content": data["message_content"],
+                }
+            )
+        elif message_type is ClientMessages.SEND_ROOM_MESSAGE:
+            if not await rooms.is_member(
+                ctx,
+                room_id=data["target_room_id"],
+                account_id=account_id,
+            ):
+                logger.warning(
+                    "Dropping message to a room the sender is not in",
+                    account_id=account_id,
+                    room_id=data["target_room_id"],
+                )
+                continue
+
+            outgoing.append(
+                {
+                    "room_id": data["target_room_id"],
+                    "message_content": data["message_content"],
+                }
+            )
+        elif message_type is ClientMessages.MARK_AS_READ:
+            receipts.mark_as_read(
+                account_id=account_id,
+                other_account_id=data["target_account_id"],
+                message_id=data["message_id"],
+            )
+        elif message_type is ClientMessages.LOG_OUT:
+            logged_out = True
+            break
+        elif message_type is ClientMessages.PONG:
+            # nothing to do; hearing from the client at all is what counts
+            continue
+
+    if not outgoing:
+        return logged_out
+
+    created = await chat_messages.create_many(
+        ctx,
+        sender_account_id=account_id,
+        messages=outgoing,
+    )
+    if isinstance(created, ServiceError):
+        # e.g. the db's been down long enough for the writer to fill up
+        logger.error(
+            "Dropping chat messages which couldn't be created",
+            account_id=account_id,
+            count=len(outgoing),
+            error=created,
+        )
+        return logged_out
+
+    account_frames: dict[int, list[Frame]] = defaultdict(list)
+    room_frames: dict[int, list[Frame]] = defaultdict(list)
+    for chat_message in created:
+        if chat_message["room_id"] is not None:
+            room_frames[chat_message["room_id"]].append(
+                responses.room_message(
+                    message_id=chat_message["id"],
+                    message_content=chat_message["message_content"],
+                    sender_account_id=chat_message["sender_account_id"],
+                    room_id=chat_message["room_id"],
+                )
+            )
+        else:
+            account_frames[chat_message["recipient_account_id"]].append(
+                responses.chat_message(
+                    message_id=chat_message["id"],
+                    message_content=chat_message["message_content"],
+                    sender_account_id=chat_message["sender_account_id"],
+                )
+            )
+
+    for target_account_id, frames in account_frames.items():
+        await ctx.chat_broker.send_many(
+            target_account_id,
+            frames,
+            store_if_offline=True,
+        )
+    for room_id, frames in room_frames.items():
+        await ctx.chat_broker.send_to_room(room_id, responses.combine(frames))
+
+    return logged_out
 
 
 @router.websocket("/ws")
@@ -32,57 +152,90 @@ async def websocket_endpoint(
     websocket: WebSocket,
     ctx: WebSocketRequestContext = Depends(),
 ):
-    await websocket.accept()
+    requested = websocket.scope.get("subprotocols", [])
+    protocol = protocols.negotiate(requested)
+    await websocket.accept(
+        subprotocol=protocol.value if protocol.value in requested else None,
+    )
 
-    session_id = UUID(await websocket.receive_text())
+    # text, or a string in the negotiated format. connections aren't
+    # heartbeated until they're authenticated, so don't wait forever
+    try:
+        raw = await asyncio.wait_for(
+            receive_message(websocket),
+            timeout=settings.CHAT_IDLE_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
+    if protocol is not Protocol.JSON:
+        raw = protocols.loads(protocol, raw)
+    session_id = UUID(raw)
 
-    session = await sessions.fetch_one(ctx, session_id)
+    session = await sessions.authenticate(ctx, session_id)
     if isinstance(session, ServiceError):  # session does not exist
         raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
 
-    WEBSOCKETS[session["account_id"]].append(websocket)
-
-    # tell the client they were accepted
-    await websocket.send_json(
-        {
-            "message_type": ServerMessages.ACCEPTED,
-            "data": {},
-        }
+    connection = Connection(
+        websocket,
+        account_id=session["account_id"],
+        max_queue_size=settings.CHAT_SEND_QUEUE_SIZE,
+        overflow_policy=OverflowPolicy(settings.CHAT_SEND_QUEUE_OVERFLOW_POLICY),
+        protocol=protocol,
+        app_pings=heartbeats.wants_app_pings(websocket),
     )
-
+    connection.start()
     try:
+        heartbeats.watch(connection)
+
+        # tell the client they were accepted
+        connection.send(responses.accepted())
+
+        # live frames are held back until the offline ones have been
+        # replayed, so they can't arrive out of order
+        connection.hold()
+
+        room_ids = await rooms.fetch_room_ids(ctx, session["account_id"])
+        await ctx.chat_broker.connect(connection, room_ids=room_ids)
+
+        # replay anything sent to them while they were offline, a batch at a
+        # time; only once subscribed, after which nothing more gets stored
+        offline_frames = await ctx.chat_broker.fetch_offline(session["account_id"])
+        for i in range(0, len(offline_frames), settings.CHAT_OFFLINE_BATCH_SIZE):
+            batch = offline_frames[i : i + settings.CHAT_OFFLINE_BATCH_SIZE]
+            connection.send(responses.batch(batch))
+
+        # a connection which dropped in the meantime leaves them stored, to
+        # be replayed to the next one
+        if not connection.closed:
+            await ctx.chat_broker.ack_offline(
+                session["account_id"],
+                len(offline_frames),
+            )
+
+        connection.release()
+
         while True:
-            packet = Packet(**await websocket.receive_json())
-            logger.debug("Handling packet: ", packet=packet)
-            if packet.message_type == ClientMessages.SEND_CHAT_MESSAGE:
-                data = SendChatMessage(**packet.data)
-
-                target_websockets = WEBSOCKETS[data.target_account_id]
-                for target_websocket in target_websockets:
-                    await target_websocket.send_json(
-                        {
-                            "message_type": ClientMessages.SEND_CHAT_MESSAGE,
-                            "data": {
-                                "message_content": data.message_content,
-                                "sender_account_id": session["account_id"],
-                            },
-                        }
-                    )
-            elif packet.message_type == ClientMessages.MARK_AS_READ:
-                pass
-            elif packet.message_type == ClientMessages.LOG_OUT:
+            raw = await receive_message(websocket)
+            connection.touch()
+
+            packets = decoding.decode(raw, protocol)
+            logger.debug("Handling packets: ", packets=packets)
+            sessions.touch(session)
+
+            logged_out = await handle_packets(ctx, session["account_id"], packets)
+            if logged_out:
                 break
-        pass
     except WebSocketDisconnect:
         pass
     else:
         await websocket.close()
+    finally:
+        await connection.stop()
+        await ctx.chat_broker.disconnect(connection)
 
-    WEBSOCKETS[session["account_id"]].remove(websocket)
-
-    data = await sessions.logout(ctx, session_id)
-    if isinstance(data, ServiceError):
-        # we won't raise an exception here, but this is weird
-        logger.error("Failed to logout session", error=data)
-    else:
-        logger.info("Session logged out", data=data)
+        data = await sessions.logout(ctx, session_id)
+        if isinstance(data, ServiceError):
+            # we won't raise an exception here, but this is weird
+            logger.error("Failed to logout session", error=data)
+        else:
+            logger.info("Session logged out", data=data)
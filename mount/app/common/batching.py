@@ -0,0 +1,164 @@
+import asyncio
+import time
+import typing
+
+from app.common import logger
+from app.common import metrics
+from app.common.context import Context
+
+T = typing.TypeVar("T")
+
+
+class WriteBehindBuffer(typing.Generic[T]):
+    """Collects items in memory and hands them to `flush` in batches from a
+    background task, once `max_size` items are pending or every `interval`
+    seconds, whichever comes first.
+
+    Items added with a key replace any pending item with the same key (or
+    are combined with it, by `merge`), so repeated writes to the same thing
+    between flushes cost a single write.
+    A failed batch is put back, ahead of anything added since, & retried
+    with exponential backoff (up to `max_retry_delay`) until it succeeds;
+    nothing is dropped. Meanwhile, no more than `max_pending` items are
+    held, and `add` turns away any more.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        flush: typing.Callable[[Context, list[T]], typing.Awaitable[None]],
+        max_size: int,
+        interval: float,
+        max_pending: int | None = None,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 30.0,
+        merge: typing.Callable[[T, T], T] | None = None,
+    ) -> None:
+        self.name = name
+        self.max_size = max_size
+        self.interval = interval
+        self.max_pending = max_pending if max_pending is not None else 100 * max_size
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+        self._flush = flush
+        self._merge = merge
+        self._pending: dict[typing.Hashable, T] = {}
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._failures = 0  # consecutive failed flushes
+        self._ctx: Context | None = None
+        self._flusher: asyncio.Task | None = None
+
+        metrics.register_gauge(f"{name}.pending", lambda: len(self._pending))
+
+    def has_room(self, count: int = 1) -> bool:
+        return len(self._pending) + count <= self.max_pending
+
+    def add(self, item: T, key: typing.Hashable | None = None) -> bool:
+        """Queue an item to be flushed; returns False (& drops it) if the
+        buffer is already holding `max_pending` items."""
+        if key is None:
+            key = object()
+        elif key in self._pending:
+            if self._merge is not None:
+                item = self._merge(self._pending[key], item)
+            self._pending[key] = item
+            return True
+
+        if not self.has_room():
+            metrics.increment(f"{self.name}.rejected")
+            return False
+
+        self._pending[key] = item
+
+        if len(self._pending) >= self.max_size:
+            self._full.set()
+        return True
+
+    def start(self, ctx: Context) -> None:
+        self._ctx = ctx
+        self._flusher = asyncio.create_task(self._flush_forever())
+
+    async def stop(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+
+        # write out whatever's left before shutting down
+        await self.flush()
+        if self._pending:
+            logger.error(
+                "Shut down with unflushed write-behind items",
+                buffer=self.name,
+                count=len(self._pending),
+            )
+
+    async def flush(self) -> bool:
+        """Flush the pending items in a single batch; returns False if that
+        failed, & the items were put back."""
+        async with self._lock:
+            if not self._pending:
+                return True
+
+            pending = self._pending
+            self._pending = {}
+            self._full.clear()
+
+            if await self._flush_batch(list(pending.values())):
+                self._failures = 0
+                return True
+
+            # back in front of anything added while the batch was in flight,
+            # merging with any of those added under the same key
+            for key, item in self._pending.items():
+                if key in pending and self._merge is not None:
+                    item = self._merge(pending[key], item)
+                pending[key] = item
+            self._pending = pending
+            self._failures += 1
+            return False
+
+    async def _flush_batch(self, batch: list[T]) -> bool:
+        assert self._ctx is not None
+
+        start_time = time.perf_counter()
+        try:
+            await self._flush(self._ctx, batch)
+        except Exception as exc:
+            metrics.increment(f"{self.name}.flush_failures")
+            logger.warning(
+                "Failed to flush write-behind buffer",
+                buffer=self.name,
+                batch_size=len(batch),
+                failures=self._failures,
+                error=exc,
+            )
+            return False
+
+        metrics.increment(f"{self.name}.flushes")
+        metrics.increment(f"{self.name}.items", len(batch))
+        metrics.observe(f"{self.name}.batch_size", len(batch))
+        metrics.observe(
+            f"{self.name}.flush_latency_ms",
+            (time.perf_counter() - start_time) * 1000,
+        )
+        return True
+
+    async def _flush_forever(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+            if not await self.flush():
+                # outside of the lock, so nothing else waits on the backoff
+                backoff = 2 ** min(self._failures - 1, 16)
+                await asyncio.sleep(
+                    min(self.retry_delay * backoff, self.max_retry_delay)
+                )
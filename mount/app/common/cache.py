@@ -0,0 +1,93 @@
+import asyncio
+import time
+import typing
+from collections import OrderedDict
+
+from aioredis import Redis
+from aioredis.exceptions import ConnectionError
+from app.common import logger
+from app.common import metrics
+
+RESUBSCRIBE_DELAY = 1.0  # seconds
+
+T = typing.TypeVar("T")
+
+
+class LRUCache(typing.Generic[T]):
+    """A size-bounded, in-process cache which evicts the least recently used
+    entry when full, and treats entries older than `ttl` seconds (or past the
+    deadline they were stored with) as missing."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        # key -> (monotonic deadline, value)
+        self._entries: OrderedDict[str, tuple[float, T]] = OrderedDict()
+
+        metrics.register_gauge(f"cache.{name}.size", lambda: len(self._entries))
+
+    def get(self, key: str) -> T | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            metrics.increment(f"cache.{self.name}.misses")
+            return None
+
+        deadline, value = entry
+        if deadline <= time.monotonic():
+            del self._entries[key]
+            metrics.increment(f"cache.{self.name}.misses")
+            return None
+
+        self._entries.move_to_end(key)
+        metrics.increment(f"cache.{self.name}.hits")
+        return value
+
+    def set(self, key: str, value: T, ttl: float | None = None) -> None:
+        if ttl is None or ttl > self.ttl:
+            ttl = self.ttl
+
+        if ttl <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            metrics.increment(f"cache.{self.name}.evictions")
+
+    def delete(self, key: str) -> None:
+        if self._entries.pop(key, None) is not None:
+            metrics.increment(f"cache.{self.name}.invalidations")
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+async def invalidate_forever(redis: Redis, channel: str, cache: LRUCache) -> None:
+    """Evict the keys published to `channel` from `cache` as they arrive.
+
+    The cache is cleared whenever the subscription is (re)established, since
+    any invalidations sent while we weren't listening have been lost.
+    """
+    while True:
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            async for message in pubsub.listen():
+                if message["type"] == "subscribe":
+                    cache.clear()
+                elif message["type"] == "message":
+                    cache.delete(message["data"].decode())
+        except ConnectionError as exc:
+            logger.warning(
+                "Lost cache invalidation connection",
+                cache=cache.name,
+                error=exc,
+            )
+        finally:
+            await pubsub.reset()
+
+        await asyncio.sleep(RESUBSCRIBE_DELAY)
@@ -21,3 +21,13 @@ class ServiceError(str, Enum):
     AVATARS_NOT_FOUND = "avatars.not_found"
     AVATARS_CONTENT_TYPE_INVALID = "avatars.content_type_invalid"
     AVATARS_SIZE_TOO_LARGE = "avatars.size_too_large"
+
+    CHAT_MESSAGES_CREATION_FAILED = "chat_messages.creation_failed"
+
+    ROOMS_CREATION_FAILED = "rooms.creation_failed"
+    ROOMS_NOT_FOUND = "rooms.not_found"
+    ROOMS_NAME_INVALID = "rooms.name_invalid"
+
+    ROOM_MEMBERS_CREATION_FAILED = "room_members.creation_failed"
+    ROOM_MEMBERS_NOT_FOUND = "room_members.not_found"
+    ROOM_MEMBERS_FORBIDDEN = "room_members.forbidden"
@@ -0,0 +1,73 @@
+import asyncio
+import time
+import typing
+from concurrent.futures import Executor
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+
+from app.common import metrics
+
+T = typing.TypeVar("T")
+
+
+class BoundedExecutor:
+    """Runs blocking or CPU-bound functions off the event loop, on a pool
+    of `max_workers` threads or processes.
+
+    At most `max_workers` calls are handed to the pool at once; the rest
+    wait their turn here, which is what the queue time metric measures.
+    """
+
+    def __init__(self, name: str, executor_type: str, max_workers: int) -> None:
+        assert executor_type in ("thread", "process")
+        self.name = name
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+
+        self._executor: Executor | None = None
+        self._slots = asyncio.Semaphore(max_workers)
+        self._waiting = 0
+
+        metrics.register_gauge(f"{name}.waiting", lambda: self._waiting)
+
+    def start(self) -> None:
+        if self.executor_type == "process":
+            self._executor = ProcessPoolExecutor(self.max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(
+                self.max_workers,
+                thread_name_prefix=self.name,
+            )
+
+    def stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def run(self, fn: typing.Callable[..., T], *args: typing.Any) -> T:
+        assert self._executor is not None, f"{self.name} has not been started"
+
+        queued_at = time.perf_counter()
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+        try:
+            started_at = time.perf_counter()
+            metrics.observe(
+                f"{self.name}.queue_time_ms",
+                (started_at - queued_at) * 1e3,
+            )
+
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, fn, *args)
+
+            metrics.observe(
+                f"{self.name}.run_time_ms",
+                (time.perf_counter() - started_at) * 1e3,
+            )
+            return result
+        finally:
+            self._slots.release()
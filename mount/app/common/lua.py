@@ -0,0 +1,31 @@
+from aioredis import Redis
+from aioredis.client import Pipeline
+from aioredis.client import Script
+
+
+class LuaScript:
+    """A lua script which can be declared at module scope, & is set up (its
+    sha computed) once, on first use, rather than by `register_script` on
+    every call.
+
+    Runs against whichever client or pipeline it's called with, so it can
+    be shared by everything that's handed a redis client per call (e.g.
+    repositories, through their context).
+    """
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self._script: Script | None = None
+
+    async def __call__(
+        self,
+        client: Redis | Pipeline,
+        keys: list,
+        args: list,
+    ):
+        if self._script is None:
+            # the client's only needed for its encoding of the source
+            self._script = Script(client, self.source)
+
+        # queued rather than run, for a pipeline
+        return await self._script(keys=keys, args=args, client=client)
@@ -0,0 +1,39 @@
+import typing
+from collections import defaultdict
+
+# NOTE: metrics are tracked per process; each worker reports its own
+
+_COUNTERS: dict[str, int] = defaultdict(int)
+_GAUGES: dict[str, typing.Callable[[], float]] = {}
+_SUMMARIES: dict[str, dict[str, float]] = {}
+
+
+def increment(name: str, value: int = 1) -> None:
+    _COUNTERS[name] += value
+
+
+def observe(name: str, value: float) -> None:
+    summary = _SUMMARIES.get(name)
+    if summary is None:
+        summary = _SUMMARIES[name] = {"count": 0, "sum": 0.0, "max": value}
+
+    summary["count"] += 1
+    summary["sum"] += value
+    if value > summary["max"]:
+        summary["max"] = value
+
+
+def register_gauge(name: str, callback: typing.Callable[[], float]) -> None:
+    _GAUGES[name] = callback
+
+
+def unregister_gauge(name: str) -> None:
+    _GAUGES.pop(name, None)
+
+
+def snapshot() -> dict[str, typing.Any]:
+    return {
+        "counters": dict(_COUNTERS),
+        "gauges": {name: callback() for name, callback in _GAUGES.items()},
+        "summaries": {name: dict(summary) for name, summary in _SUMMARIES.items()},
+    }
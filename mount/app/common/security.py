@@ -1,4 +1,6 @@
 import bcrypt
+from app.common import settings
+from app.common.executors import BoundedExecutor
 
 
 def hash_password(password: str) -> bytes:
@@ -7,3 +9,21 @@ def hash_password(password: str) -> bytes:
 
 def verify_password(password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+
+class PasswordHasher(BoundedExecutor):
+    """Runs bcrypt off the event loop, so that hashing a password doesn't
+    stall every other request and socket on the worker."""
+
+    async def hash_password(self, password: str) -> bytes:
+        return await self.run(hash_password, password)
+
+    async def verify_password(self, password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, password, hashed_password)
+
+
+PASSWORD_HASHER = PasswordHasher(
+    name="security.password_hasher",
+    executor_type=settings.PASSWORD_HASHING_EXECUTOR,
+    max_workers=settings.PASSWORD_HASHING_MAX_WORKERS,
+)
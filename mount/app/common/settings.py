@@ -5,6 +5,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 APP_ENV = os.environ["APP_ENV"]
+APP_HOST = os.environ["APP_HOST"]
+APP_INTERNAL_PORT = int(os.environ["APP_INTERNAL_PORT"])
 APP_LOG_LEVEL = int(os.environ["APP_LOG_LEVEL"])
 
 DB_DRIVER = os.environ["DB_DRIVER"]
@@ -21,3 +23,96 @@ AWS_ACCESS_KEY_ID = os.environ["AWS_ACCESS_KEY_ID"]
 AWS_SECRET_ACCESS_KEY = os.environ["AWS_SECRET_ACCESS_KEY"]
 AWS_S3_BUCKET_REGION = os.environ["AWS_S3_BUCKET_REGION"]
 AWS_S3_BUCKET_NAME = os.environ["AWS_S3_BUCKET_NAME"]
+
+# permessage-deflate; see benchmarks/websocket_compression.py for the tradeoffs
+WS_COMPRESSION_ENABLED = os.environ.get("WS_COMPRESSION_ENABLED", "true") == "true"
+WS_COMPRESSION_MIN_SIZE = int(os.environ.get("WS_COMPRESSION_MIN_SIZE", "64"))  # bytes
+WS_COMPRESSION_CONTEXT_TAKEOVER = (
+    os.environ.get("WS_COMPRESSION_CONTEXT_TAKEOVER", "true") == "true"
+)
+WS_COMPRESSION_SERVER_MAX_WINDOW_BITS = int(
+    os.environ.get("WS_COMPRESSION_SERVER_MAX_WINDOW_BITS", "12")
+)
+WS_COMPRESSION_CLIENT_MAX_WINDOW_BITS = int(
+    os.environ.get("WS_COMPRESSION_CLIENT_MAX_WINDOW_BITS", "12")
+)
+WS_COMPRESSION_MEMORY_LEVEL = int(os.environ.get("WS_COMPRESSION_MEMORY_LEVEL", "5"))
+
+CHAT_SEND_QUEUE_SIZE = int(os.environ.get("CHAT_SEND_QUEUE_SIZE", "256"))
+# one of: drop_oldest, disconnect
+CHAT_SEND_QUEUE_OVERFLOW_POLICY = os.environ.get(
+    "CHAT_SEND_QUEUE_OVERFLOW_POLICY", "drop_oldest"
+)
+
+# frames kept for accounts while they're offline, & how many to replay per frame
+CHAT_OFFLINE_QUEUE_SIZE = int(os.environ.get("CHAT_OFFLINE_QUEUE_SIZE", "1000"))
+CHAT_OFFLINE_QUEUE_TTL = int(
+    os.environ.get("CHAT_OFFLINE_QUEUE_TTL", "604800")
+)  # seconds
+CHAT_UNREAD_COUNTS_TTL = int(
+    os.environ.get("CHAT_UNREAD_COUNTS_TTL", "2592000")
+)  # seconds since the last unread message
+CHAT_OFFLINE_BATCH_SIZE = int(os.environ.get("CHAT_OFFLINE_BATCH_SIZE", "100"))
+CHAT_CLIENT_BATCH_MAX_SIZE = int(os.environ.get("CHAT_CLIENT_BATCH_MAX_SIZE", "100"))
+
+# idle connections are pinged, & closed if they stay idle past the timeout
+CHAT_PING_INTERVAL = float(os.environ.get("CHAT_PING_INTERVAL", "30"))  # seconds
+CHAT_IDLE_TIMEOUT = float(os.environ.get("CHAT_IDLE_TIMEOUT", "75"))  # seconds
+
+# room memberships are cached per worker, & invalidated through redis
+ROOM_CACHE_SIZE = int(os.environ.get("ROOM_CACHE_SIZE", "10000"))
+ROOM_CACHE_TTL = float(os.environ.get("ROOM_CACHE_TTL", "300"))  # seconds
+
+# read cursors (& receipts) are written at most this often per conversation
+CHAT_READ_CURSOR_FLUSH_INTERVAL = float(
+    os.environ.get("CHAT_READ_CURSOR_FLUSH_INTERVAL", "2")
+)  # seconds
+
+# accounts are cached per worker & in redis (without their password hashes);
+# lookups which found nothing are cached too, for a shorter time
+ACCOUNT_CACHE_ENABLED = os.environ.get("ACCOUNT_CACHE_ENABLED", "true") == "true"
+ACCOUNT_CACHE_SIZE = int(os.environ.get("ACCOUNT_CACHE_SIZE", "10000"))
+ACCOUNT_CACHE_TTL = float(os.environ.get("ACCOUNT_CACHE_TTL", "60"))  # seconds
+ACCOUNT_CACHE_REDIS_TTL = int(
+    os.environ.get("ACCOUNT_CACHE_REDIS_TTL", "300")
+)  # seconds
+ACCOUNT_CACHE_NEGATIVE_TTL = int(
+    os.environ.get("ACCOUNT_CACHE_NEGATIVE_TTL", "10")
+)  # seconds
+
+SESSION_CACHE_ENABLED = os.environ.get("SESSION_CACHE_ENABLED", "true") == "true"
+SESSION_CACHE_SIZE = int(os.environ.get("SESSION_CACHE_SIZE", "10000"))
+SESSION_CACHE_TTL = float(os.environ.get("SESSION_CACHE_TTL", "60"))  # seconds
+
+# push back a session's expiry on activity, at most once per refresh interval
+SESSION_SLIDING_EXPIRY = os.environ.get("SESSION_SLIDING_EXPIRY", "true") == "true"
+SESSION_REFRESH_INTERVAL = int(os.environ.get("SESSION_REFRESH_INTERVAL", "300"))
+# refreshes are written in batches of up to this size, or this often
+SESSION_REFRESH_BATCH_SIZE = int(os.environ.get("SESSION_REFRESH_BATCH_SIZE", "500"))
+SESSION_REFRESH_FLUSH_INTERVAL = float(
+    os.environ.get("SESSION_REFRESH_FLUSH_INTERVAL", "5")
+)  # seconds
+SESSION_REAP_INTERVAL = int(os.environ.get("SESSION_REAP_INTERVAL", "60"))
+
+# one of: thread, process
+PASSWORD_HASHING_EXECUTOR = os.environ.get("PASSWORD_HASHING_EXECUTOR", "thread")
+PASSWORD_HASHING_MAX_WORKERS = int(os.environ.get("PASSWORD_HASHING_MAX_WORKERS", "4"))
+
+# one of: thread, process
+AVATAR_RESIZE_EXECUTOR = os.environ.get("AVATAR_RESIZE_EXECUTOR", "process")
+AVATAR_RESIZE_MAX_WORKERS = int(os.environ.get("AVATAR_RESIZE_MAX_WORKERS", "2"))
+
+# chat messages are written in batches of up to this size, or this often
+CHAT_MESSAGE_FLUSH_SIZE = int(os.environ.get("CHAT_MESSAGE_FLUSH_SIZE", "500"))
+CHAT_MESSAGE_FLUSH_INTERVAL = float(
+    os.environ.get("CHAT_MESSAGE_FLUSH_INTERVAL", "1")
+)  # seconds
+CHAT_MESSAGE_FLUSH_RETRY_DELAY = float(
+    os.environ.get("CHAT_MESSAGE_FLUSH_RETRY_DELAY", "0.5")
+)  # seconds, doubled after each failed attempt
+# messages are refused once this many are waiting to be written, e.g. while
+# the db is down, rather than being held in memory without limit
+CHAT_MESSAGE_MAX_PENDING = int(os.environ.get("CHAT_MESSAGE_MAX_PENDING", "50000"))
+
+# seconds a dead process' snowflake worker id stays leased
+SNOWFLAKE_WORKER_ID_TTL = int(os.environ.get("SNOWFLAKE_WORKER_ID_TTL", "30"))
@@ -0,0 +1,176 @@
+import asyncio
+import random
+import secrets
+import time
+
+from aioredis import Redis
+from app.common import logger
+from app.common import metrics
+
+# 39 bits of milliseconds since EPOCH | 6 bits of worker id | 8 bits of sequence
+#
+# this keeps ids below 2**53 (until 2040), so that javascript clients can
+# represent them exactly, while allowing 256 ids per ms from each of 64 workers
+EPOCH = 1672531200000  # 2023-01-01T00:00:00Z, in ms
+WORKER_ID_BITS = 6
+SEQUENCE_BITS = 8
+
+MAX_WORKER_ID = (1 << WORKER_ID_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+# extend a lease, or give it up, only if this process still holds it
+REFRESH_LEASE_SCRIPT = """\
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("EXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LEASE_SCRIPT = """\
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+class SnowflakeGenerator:
+    """Generates roughly time-ordered, unique 53-bit ids without a round
+    trip to the database, so rows can be given an id before they're written.
+
+    Uniqueness across processes relies on every process having a distinct
+    worker id; see `WorkerIdLease`.
+    """
+
+    def __init__(self, worker_id: int = 0) -> None:
+        assert 0 <= worker_id <= MAX_WORKER_ID
+        self.worker_id = worker_id
+
+        self._last_timestamp = -1
+        self._sequence = 0
+
+    def next_id(self) -> int:
+        # never go backwards, even if the system clock does
+        timestamp = max(int(time.time() * 1000) - EPOCH, self._last_timestamp)
+
+        if timestamp == self._last_timestamp:
+            self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+            if self._sequence == 0:
+                # used up this millisecond; borrow the next one
+                timestamp += 1
+        else:
+            self._sequence = 0
+
+        self._last_timestamp = timestamp
+        return (
+            (timestamp << (WORKER_ID_BITS + SEQUENCE_BITS))
+            | (self.worker_id << SEQUENCE_BITS)
+            | self._sequence
+        )
+
+
+class NoWorkerIdAvailable(Exception):
+    pass
+
+
+class WorkerIdLease:
+    """Leases a worker id for a `SnowflakeGenerator`, so that no two running
+    processes ever share one.
+
+    Each id is a redis key, claimed with SET NX and a `ttl`, which is kept
+    alive while the process runs & deleted when it shuts down; the ids of
+    processes which died without releasing them become free again once
+    their keys expire. A lease which was lost anyway (e.g. redis was
+    unreachable for longer than `ttl`) is swapped for a free id.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        generator: SnowflakeGenerator,
+        ttl: int,
+    ) -> None:
+        self.redis = redis
+        self.generator = generator
+        self.ttl = ttl
+
+        self._refresh_lease = redis.register_script(REFRESH_LEASE_SCRIPT)
+        self._release_lease = redis.register_script(RELEASE_LEASE_SCRIPT)
+
+        self._token = secrets.token_hex(16)
+        self._worker_id: int | None = None
+        self._refresher: asyncio.Task | None = None
+
+    @staticmethod
+    def make_key(worker_id: int) -> str:
+        return f"server:snowflake:worker_ids:{worker_id}"
+
+    async def acquire(self) -> int:
+        """Claim a free worker id, and hand it to the generator.
+
+        Raises `NoWorkerIdAvailable` if every id is leased.
+        """
+        # start somewhere random, so processes starting together don't all
+        # contend for the same ids
+        offset = random.randint(0, MAX_WORKER_ID)
+        for i in range(MAX_WORKER_ID + 1):
+            worker_id = (offset + i) & MAX_WORKER_ID
+            claimed = await self.redis.set(
+                self.make_key(worker_id),
+                self._token,
+                nx=True,
+                ex=self.ttl,
+            )
+            if claimed:
+                self._worker_id = worker_id
+                self.generator.worker_id = worker_id
+                return worker_id
+
+        raise NoWorkerIdAvailable()
+
+    async def refresh(self) -> None:
+        assert self._worker_id is not None
+
+        refreshed = await self._refresh_lease(
+            keys=[self.make_key(self._worker_id)],
+            args=[self._token, self.ttl],
+        )
+        if refreshed:
+            return
+
+        metrics.increment("snowflake.leases_lost")
+        logger.error("Lost worker id lease", worker_id=self._worker_id)
+        await self.acquire()
+        logger.info("Leased a new worker id", worker_id=self._worker_id)
+
+    async def release(self) -> None:
+        if self._worker_id is None:
+            return
+
+        await self._release_lease(
+            keys=[self.make_key(self._worker_id)],
+            args=[self._token],
+        )
+        self._worker_id = None
+
+    def start(self) -> None:
+        self._refresher = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self) -> None:
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+        await self.release()
+
+    async def _refresh_forever(self) -> None:
+        # often enough that a couple of failed attempts don't lose the lease
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                await self.refresh()
+            except Exception as exc:
+                logger.error("Failed to refresh worker id lease", error=exc)
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import typing
+
+from app.common import logger
+from app.common import metrics
+
+
+class Timer:
+    __slots__ = ("callback", "rounds", "cancelled")
+
+    def __init__(self, callback: typing.Callable[[], None], rounds: int) -> None:
+        self.callback = callback
+        self.rounds = rounds
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        # left in its slot, and skipped when the slot comes round
+        self.cancelled = True
+
+
+class TimerWheel:
+    """Runs callbacks after a delay, at `tick` resolution, with one task for
+    all timers rather than a sleeping task each.
+
+    Timers are hashed into a ring of slots by the tick they're due on, and
+    each tick only looks at the timers in one slot; those due further out
+    than a full turn of the wheel wait for that many more rounds. Scheduling
+    and cancelling are O(1), however many timers are pending.
+
+    Callbacks run on the wheel's task, so they must be quick & must not
+    block; anything slow belongs in a task of its own.
+    """
+
+    def __init__(self, name: str, tick: float, num_slots: int) -> None:
+        self.name = name
+        self.tick = tick
+        self._slots: list[list[Timer]] = [[] for _ in range(num_slots)]
+        self._current = 0  # the slot due on the next tick
+        self._ticker: asyncio.Task | None = None
+
+    def schedule(self, delay: float, callback: typing.Callable[[], None]) -> Timer:
+        ticks = max(math.ceil(delay / self.tick), 1)
+        rounds, offset = divmod(ticks - 1, len(self._slots))
+
+        timer = Timer(callback, rounds)
+        self._slots[(self._current + offset) % len(self._slots)].append(timer)
+        return timer
+
+    def _count_timers(self) -> int:
+        return sum(len(slot) for slot in self._slots)
+
+    def start(self) -> None:
+        self._ticker = asyncio.create_task(self._tick_forever())
+        metrics.register_gauge(f"{self.name}.timers", self._count_timers)
+
+    async def stop(self) -> None:
+        metrics.unregister_gauge(f"{self.name}.timers")
+
+        if self._ticker is not None:
+            self._ticker.cancel()
+            try:
+                await self._ticker
+            except asyncio.CancelledError:
+                pass
+            self._ticker = None
+
+    def _advance(self) -> None:
+        slot = self._slots[self._current]
+        self._slots[self._current] = []
+        self._current = (self._current + 1) % len(self._slots)
+
+        for timer in slot:
+            if timer.cancelled:
+                continue
+
+            if timer.rounds > 0:
+                timer.rounds -= 1
+                self._slots[self._current - 1].append(timer)
+                continue
+
+            try:
+                timer.callback()
+            except Exception as exc:
+                logger.error("Failed to run timer", wheel=self.name, error=exc)
+
+    async def _tick_forever(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time() + self.tick
+        while True:
+            await asyncio.sleep(max(next_tick - loop.time(), 0))
+
+            # catch up on any ticks missed while the loop was busy, without
+            # letting the wheel drift
+            while next_tick <= loop.time():
+                self._advance()
+                next_tick += self.tick
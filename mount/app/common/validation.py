@@ -5,6 +5,10 @@ def validate_username(username: str) -> bool:
     return 3 <= len(username) <= 16
 
 
+def validate_room_name(name: str) -> bool:
+    return 1 <= len(name) <= 64
+
+
 def validate_password(password: str) -> bool:
     if not 8 <= len(password) <= 128:
         return False
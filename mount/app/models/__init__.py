@@ -24,13 +24,20 @@ class BaseModel(_BaseModel):
 
 class ClientMessages(str, Enum):
     SEND_CHAT_MESSAGE = "SEND_CHAT_MESSAGE"
+    SEND_ROOM_MESSAGE = "SEND_ROOM_MESSAGE"
     MARK_AS_READ = "MARK_AS_READ"
     LOG_OUT = "LOG_OUT"
+    BATCH = "BATCH"
+    PONG = "PONG"
 
 
 class ServerMessages(str, Enum):
     ACCEPTED = "ACCEPTED"
     SEND_CHAT_MESSAGE = "SEND_CHAT_MESSAGE"
+    SEND_ROOM_MESSAGE = "SEND_ROOM_MESSAGE"
+    READ_RECEIPT = "READ_RECEIPT"
+    BATCH = "BATCH"
+    PING = "PING"
 
 
 class Packet(BaseModel):
@@ -38,3 +45,8 @@ class Packet(BaseModel):
 
     # to be parsed into a specific model using `message_type`
     data: dict[str, typing.Any]
+
+
+class Batch(BaseModel):
+    # handled as if each had been sent in its own frame, in order
+    messages: list[Packet]
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from . import BaseModel
 
 # input models
@@ -8,4 +10,29 @@ class SendChatMessage(BaseModel):
     target_account_id: int
 
 
+class SendRoomMessage(BaseModel):
+    message_content: str
+    target_room_id: int
+
+
+class MarkAsRead(BaseModel):
+    # everything up to (and including) `message_id`
+    # in the conversation with `target_account_id`
+    target_account_id: int
+    message_id: int
+
+
 # output models
+class ChatMessage(BaseModel):
+    id: int
+    sender_account_id: int
+    recipient_account_id: int | None
+    room_id: int | None
+    message_content: str
+    status: str
+    created_at: datetime
+
+
+class UnreadCount(BaseModel):
+    account_id: int
+    unread_count: int
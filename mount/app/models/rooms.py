@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from . import BaseModel
+
+# input models
+
+
+class CreateRoomForm(BaseModel):
+    name: str
+
+
+# output models
+class Room(BaseModel):
+    id: int
+    name: str
+    owner_account_id: int
+    status: str
+    created_at: datetime
+    updated_at: datetime
+
+
+class RoomMember(BaseModel):
+    room_id: int
+    account_id: int
+    created_at: datetime
@@ -1,45 +1,196 @@
 import typing
+from datetime import datetime
 
+from app.common import json
+from app.common import metrics
 from app.common import security
+from app.common import settings
+from app.common.cache import LRUCache
 from app.common.context import Context
 from app.models import Status
+from pymysql.constants import ER
+from pymysql.err import IntegrityError
+
+# cached in place of an account, for lookups which found nothing, so that
+# e.g. signup's existence checks & logins with unknown usernames are cheap
+_NOT_FOUND: dict[str, typing.Any] = {}
+
+# "id:{id}", "username:{username}" or "email:{email address}" -> account,
+# without its password hash, or _NOT_FOUND
+ACCOUNT_CACHE: LRUCache[dict[str, typing.Any]] = LRUCache(
+    name="accounts",
+    maxsize=settings.ACCOUNT_CACHE_SIZE,
+    ttl=settings.ACCOUNT_CACHE_TTL,
+)
+
+
+def _serialize(account: dict[str, typing.Any]) -> bytes:
+    return json.dumps(account)
+
+
+def _deserialize(raw_account: bytes) -> dict[str, typing.Any]:
+    account = json.loads(raw_account)
+    if not account:
+        return _NOT_FOUND
+
+    account["created_at"] = datetime.fromisoformat(account["created_at"])
+    account["updated_at"] = datetime.fromisoformat(account["updated_at"])
+    return account
+
+
+class AccountExists(Exception):
+    def __init__(self, field: str) -> None:
+        super().__init__(field)
+        self.field = field  # "username" or "email_address"
 
 
 class AccountsRepo:
+    INVALIDATION_CHANNEL = "server:accounts:invalidations"
+
+    # field -> the unique index on it, as named by the migrations
+    UNIQUE_INDEXES = {
+        "username": "accounts_username_uidx",
+        "email_address": "accounts_email_address_uidx",
+    }
+
+    # password hashes are left out, so that they never end up in a cache;
+    # they're only ever read by `fetch_password_hash`
     READ_PARAMS = """\
-        id, email_address, password, username, status, created_at, updated_at
+        id, email_address, username, status, created_at, updated_at
     """
 
     def __init__(self, ctx: Context) -> None:
         self.ctx = ctx
 
+    @staticmethod
+    def make_cache_key(
+        account_id: int | None = None,
+        email_address: str | None = None,
+        username: str | None = None,
+    ) -> str | None:
+        # usernames & email addresses are compared case insensitively by
+        # mysql, so they're cached that way too
+        if account_id is not None and email_address is None and username is None:
+            return f"id:{account_id}"
+        elif email_address is not None and account_id is None and username is None:
+            return f"email:{email_address.lower()}"
+        elif username is not None and account_id is None and email_address is None:
+            return f"username:{username.lower()}"
+        return None  # lookups by more than one field aren't cached
+
+    @staticmethod
+    def make_redis_key(cache_key: str) -> str:
+        return f"server:accounts:cache:{cache_key}"
+
+    async def _cache_get(self, cache_key: str) -> dict[str, typing.Any] | None:
+        # copies are handed out, so that callers can't change the cached
+        # accounts; _NOT_FOUND itself is, since it's compared by identity
+        account = ACCOUNT_CACHE.get(cache_key)
+        if account is not None:
+            return account if account is _NOT_FOUND else dict(account)
+
+        raw_account = await self.ctx.redis.get(self.make_redis_key(cache_key))
+        if raw_account is None:
+            metrics.increment("cache.accounts.redis_misses")
+            return None
+
+        metrics.increment("cache.accounts.redis_hits")
+        account = _deserialize(raw_account)
+        ACCOUNT_CACHE.set(
+            cache_key,
+            account,
+            ttl=settings.ACCOUNT_CACHE_NEGATIVE_TTL
+            if account is _NOT_FOUND
+            else None,
+        )
+        return account if account is _NOT_FOUND else dict(account)
+
+    async def _cache_set(
+        self,
+        cache_key: str,
+        account: dict[str, typing.Any] | None,
+    ) -> None:
+        if account is None:
+            ttl = settings.ACCOUNT_CACHE_NEGATIVE_TTL
+            account = _NOT_FOUND
+        else:
+            ttl = settings.ACCOUNT_CACHE_REDIS_TTL
+            account = dict(account)  # the caller's is handed back to them
+
+        ACCOUNT_CACHE.set(cache_key, account, ttl=ttl)
+        await self.ctx.redis.set(
+            self.make_redis_key(cache_key),
+            _serialize(account),
+            ex=ttl,
+        )
+
+    async def _invalidate(self, account: dict[str, typing.Any]) -> None:
+        cache_keys = [
+            self.make_cache_key(account_id=account["id"]),
+            self.make_cache_key(email_address=account["email_address"]),
+            self.make_cache_key(username=account["username"]),
+        ]
+
+        async with self.ctx.redis.pipeline(transaction=False) as pipe:
+            for cache_key in cache_keys:
+                assert cache_key is not None
+                ACCOUNT_CACHE.delete(cache_key)
+                pipe.delete(self.make_redis_key(cache_key))
+                pipe.publish(self.INVALIDATION_CHANNEL, cache_key)
+            await pipe.execute()
+
     async def sign_up(
         self,
         email_address: str,
         password: str,
         username: str,
-    ) -> dict[str, typing.Any] | None:
+    ) -> dict[str, typing.Any]:
+        """Create an account, in a single query.
+
+        Raises `AccountExists` if the username or email address is taken.
+        """
+        # the timestamps are set here rather than defaulted by mysql, so
+        # the account can be returned without reading it back; DATETIME
+        # columns would round away the microseconds
+        now = datetime.now().replace(microsecond=0)
+
         query = """\
-            INSERT INTO accounts (email_address, password, username, status)
-                 VALUES (:email_address, :password, :username, :status)
+            INSERT INTO accounts (email_address, password, username, status,
+                                  created_at, updated_at)
+                 VALUES (:email_address, :password, :username, :status,
+                         :created_at, :updated_at)
         """
         params = {
             "email_address": email_address,
-            "password": security.hash_password(password),
+            "password": await security.PASSWORD_HASHER.hash_password(password),
             "username": username,
             "status": Status.ACTIVE,
+            "created_at": now,
+            "updated_at": now,
         }
-        insert_id = await self.ctx.db.execute(query, params)
+        try:
+            insert_id = await self.ctx.db.execute(query, params)
+        except IntegrityError as exc:
+            code, message = exc.args
+            if code == ER.DUP_ENTRY:
+                for field, index in self.UNIQUE_INDEXES.items():
+                    if f"{index}'" in message:
+                        raise AccountExists(field) from exc
+            raise
         assert insert_id is not None
 
-        query = f"""\
-            SELECT {self.READ_PARAMS}
-              FROM accounts
-             WHERE id = :id
-        """
-        params = {"id": insert_id}
-        rec = await self.ctx.db.fetch_one(query, params)
-        return dict(rec._mapping) if rec is not None else None
+        account = {
+            "id": insert_id,
+            "email_address": email_address,
+            "username": username,
+            "status": Status.ACTIVE,
+            "created_at": now,
+            "updated_at": now,
+        }
+        if settings.ACCOUNT_CACHE_ENABLED:
+            # e.g. a login attempt may have cached a miss for the username
+            await self._invalidate(account)
+        return account
 
     async def fetch_one(
         self,
@@ -47,20 +198,53 @@ class AccountsRepo:
         email_address: str | None = None,
         username: str | None = None,
     ) -> dict[str, typing.Any] | None:
+        cache_key = None
+        if settings.ACCOUNT_CACHE_ENABLED:
+            cache_key = self.make_cache_key(account_id, email_address, username)
+
+        if cache_key is not None:
+            account = await self._cache_get(cache_key)
+            if account is not None:
+                return account if account is not _NOT_FOUND else None
+
+        # only the columns being looked up by are compared, so that each
+        # lookup can use that column's index (`col = COALESCE(:col, col)`
+        # can't use any, & scans the table)
+        conditions = []
+        params: dict[str, typing.Any] = {}
+        if account_id is not None:
+            conditions.append("id = :id")
+            params["id"] = account_id
+        if email_address is not None:
+            conditions.append("email_address = :email_address")
+            params["email_address"] = email_address
+        if username is not None:
+            conditions.append("username = :username")
+            params["username"] = username
+        assert conditions, "an account must be looked up by something"
+
         query = f"""\
             SELECT {self.READ_PARAMS}
               FROM accounts
-             WHERE id = COALESCE(:id, id)
-               AND email_address = COALESCE(:email_address, email_address)
-               AND username = COALESCE(:username, username)
+             WHERE {" AND ".join(conditions)}
         """
-        params = {
-            "id": account_id,
-            "email_address": email_address,
-            "username": username,
-        }
         rec = await self.ctx.db.fetch_one(query, params)
-        return dict(rec._mapping) if rec is not None else None
+        account = dict(rec._mapping) if rec is not None else None
+
+        if cache_key is not None:
+            await self._cache_set(cache_key, account)
+
+        return account
+
+    async def fetch_password_hash(self, account_id: int) -> str | None:
+        query = """\
+            SELECT password
+              FROM accounts
+             WHERE id = :id
+        """
+        params = {"id": account_id}
+        rec = await self.ctx.db.fetch_one(query, params)
+        return rec["password"] if rec is not None else None
 
     async def fetch_many(
         self, page: int, page_size: int
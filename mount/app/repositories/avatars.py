@@ -1,5 +1,6 @@
 import io
 import typing
+from datetime import datetime
 
 from app.common import settings
 from app.common.context import Context
@@ -16,18 +17,13 @@ class AvatarsRepo:
     def __init__(self, ctx: Context) -> None:
         self.ctx = ctx
 
-    async def create(
+    async def upload(
         self,
         account_id: int,
-        breakpoint: Breakpoint,
         content_type: str,
-        width: int,
-        height: int,
-        filesize: int,
-        public_url: str,
         file_name: str,
         file_data: bytes,
-    ) -> dict[str, typing.Any] | None:
+    ) -> None:
         with io.BytesIO(file_data) as file_obj:
             await self.ctx.s3_client.put_object(
                 Bucket=settings.AWS_S3_BUCKET_NAME,
@@ -39,36 +35,50 @@ class AvatarsRepo:
                 # TODO: ACL?
             )
 
+    async def create_many(
+        self,
+        account_id: int,
+        avatars: list[dict[str, typing.Any]],
+    ) -> list[dict[str, typing.Any]]:
+        """Insert a row for each of an account's (already uploaded) avatars,
+        in a single transaction.
+
+        Each row is inserted on its own, so that its id is known exactly;
+        reading back a multi-row insert's rows by id range would also pick up
+        any other rows the account had inserted concurrently.
+        """
+        # the timestamps are set here rather than defaulted by mysql, so
+        # the avatars can be returned without reading them back
+        now = datetime.now().replace(microsecond=0)
+
         query = """\
             INSERT INTO avatars (account_id, breakpoint, content_type, width,
-                                 height, filesize, public_url, status)
+                                 height, filesize, public_url, status,
+                                 created_at, updated_at)
                  VALUES (:account_id, :breakpoint, :content_type, :width,
-                         :height, :filesize, :public_url, :status)
+                         :height, :filesize, :public_url, :status,
+                         :created_at, :updated_at)
         """
-        params = {
-            "account_id": account_id,
-            "breakpoint": breakpoint,
-            "content_type": content_type,
-            "width": width,
-            "height": height,
-            "filesize": filesize,
-            "public_url": public_url,
-            "status": Status.ACTIVE,
-        }
-        insert_id = await self.ctx.db.execute(query, params)
-        assert insert_id is not None
+        created = []
+        async with self.ctx.db.transaction():
+            for avatar in avatars:
+                params = {
+                    "account_id": account_id,
+                    "breakpoint": avatar["breakpoint"],
+                    "content_type": avatar["content_type"],
+                    "width": avatar["width"],
+                    "height": avatar["height"],
+                    "filesize": avatar["filesize"],
+                    "public_url": avatar["public_url"],
+                    "status": Status.ACTIVE,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                insert_id = await self.ctx.db.execute(query, params)
+                assert insert_id is not None
+                created.append({"id": insert_id} | params)
 
-        query = f"""\
-            SELECT {self.READ_PARAMS}
-             FROM avatars
-            WHERE id = :id
-        """
-        params = {
-            "id": insert_id,
-        }
-        rec = await self.ctx.db.fetch_one(query, params)
-        assert rec is not None
-        return dict(rec._mapping)
+        return created
 
     async def fetch_all(
         self,
@@ -0,0 +1,114 @@
+import typing
+
+from app.common.context import Context
+from app.models import Status
+from pymysql.constants import ER
+from pymysql.err import IntegrityError
+
+MAX_ID = 2**63 - 1
+
+
+class ChatMessagesRepo:
+    READ_PARAMS = """\
+        id, sender_account_id, recipient_account_id, room_id, message_content,
+        status, created_at, updated_at
+    """
+
+    def __init__(self, ctx: Context) -> None:
+        self.ctx = ctx
+
+    async def create_many(self, chat_messages: list[dict[str, typing.Any]]) -> None:
+        """Insert pre-built chat messages (ids included) in a single statement."""
+        values = []
+        params: dict[str, typing.Any] = {}
+        for i, chat_message in enumerate(chat_messages):
+            values.append(
+                f"(:id_{i}, :sender_account_id_{i}, :recipient_account_id_{i}, "
+                f":room_id_{i}, :message_content_{i}, :status_{i}, :created_at_{i})"
+            )
+            params |= {
+                f"id_{i}": chat_message["id"],
+                f"sender_account_id_{i}": chat_message["sender_account_id"],
+                f"recipient_account_id_{i}": chat_message["recipient_account_id"],
+                f"room_id_{i}": chat_message["room_id"],
+                f"message_content_{i}": chat_message["message_content"],
+                f"status_{i}": chat_message["status"],
+                f"created_at_{i}": chat_message["created_at"],
+            }
+
+        query = f"""\
+            INSERT INTO chat_messages (id, sender_account_id,
+                                       recipient_account_id, room_id,
+                                       message_content, status, created_at)
+                 VALUES {", ".join(values)}
+        """
+        try:
+            await self.ctx.db.execute(query, params)
+        except IntegrityError as exc:
+            code, _ = exc.args
+            if code != ER.DUP_ENTRY or not await self._were_written(chat_messages):
+                raise
+
+    async def _were_written(self, chat_messages: list[dict[str, typing.Any]]) -> bool:
+        """Whether the exact chat messages given are already in the db.
+
+        A single INSERT is atomic, so a retry of a batch that was written
+        (but whose response was lost) finds every message there, unchanged;
+        anything else means the ids collided with other messages.
+        """
+        params = {
+            f"id_{i}": chat_message["id"]
+            for i, chat_message in enumerate(chat_messages)
+        }
+        query = f"""\
+            SELECT id, sender_account_id, recipient_account_id, room_id,
+                   message_content
+              FROM chat_messages
+             WHERE id IN ({", ".join(f":{param}" for param in params)})
+        """
+        recs = await self.ctx.db.fetch_all(query, params)
+        written = {rec["id"]: dict(rec._mapping) for rec in recs}
+        return all(
+            written.get(chat_message["id"])
+            == {
+                "id": chat_message["id"],
+                "sender_account_id": chat_message["sender_account_id"],
+                "recipient_account_id": chat_message["recipient_account_id"],
+                "room_id": chat_message["room_id"],
+                "message_content": chat_message["message_content"],
+            }
+            for chat_message in chat_messages
+        )
+
+    async def fetch_conversation(
+        self,
+        account_id: int,
+        other_account_id: int,
+        before: int | None,
+        limit: int,
+    ) -> list[dict[str, typing.Any]]:
+        """Fetch a page of the messages between two accounts, newest first.
+
+        Pages are keyed by message id (`before`, exclusive) rather than by
+        offset, so that the conversation index can seek straight to the
+        start of the page, however far back it is.
+        """
+        query = f"""\
+            SELECT {self.READ_PARAMS}
+              FROM chat_messages
+             WHERE conversation_low = :conversation_low
+               AND conversation_high = :conversation_high
+               AND id < :before
+               AND status = :status
+          ORDER BY id DESC
+             LIMIT :limit
+        """
+        params = {
+            "conversation_low": min(account_id, other_account_id),
+            "conversation_high": max(account_id, other_account_id),
+            "before": before if before is not None else MAX_ID,
+            "status": Status.ACTIVE,
+            "limit": limit,
+        }
+        recs = await self.ctx.db.fetch_all(query, params)
+        return [dict(rec._mapping) for rec in recs]
@@ -0,0 +1,78 @@
+import typing
+
+from app.common.context import Context
+
+
+class ReadCursorsRepo:
+    def __init__(self, ctx: Context) -> None:
+        self.ctx = ctx
+
+    async def advance_many(
+        self,
+        read_cursors: list[dict[str, typing.Any]],
+    ) -> list[dict[str, typing.Any]]:
+        """Move each account's cursor in a conversation forward (never back)
+        to the given message, in a single transaction. Returns the cursors
+        which actually moved."""
+        keys = []
+        params: dict[str, typing.Any] = {}
+        for i, read_cursor in enumerate(read_cursors):
+            keys.append(f"(:account_id_{i}, :other_account_id_{i})")
+            params |= {
+                f"account_id_{i}": read_cursor["account_id"],
+                f"other_account_id_{i}": read_cursor["other_account_id"],
+            }
+
+        # locked, so that a cursor moved further by another process in the
+        # meantime isn't reported as moved here too
+        query = f"""\
+            SELECT account_id, other_account_id, last_read_message_id
+              FROM read_cursors
+             WHERE (account_id, other_account_id) IN ({", ".join(keys)})
+               FOR UPDATE
+        """
+        async with self.ctx.db.transaction():
+            recs = await self.ctx.db.fetch_all(query, params)
+            last_read_message_ids = {
+                (rec["account_id"], rec["other_account_id"]): rec[
+                    "last_read_message_id"
+                ]
+                for rec in recs
+            }
+            advanced = []
+            for read_cursor in read_cursors:
+                key = (read_cursor["account_id"], read_cursor["other_account_id"])
+                last_read_message_id = last_read_message_ids.get(key, -1)
+                if read_cursor["last_read_message_id"] > last_read_message_id:
+                    advanced.append(read_cursor)
+
+            if advanced:
+                await self._upsert_many(advanced)
+
+        return advanced
+
+    async def _upsert_many(self, read_cursors: list[dict[str, typing.Any]]) -> None:
+        values = []
+        params: dict[str, typing.Any] = {}
+        for i, read_cursor in enumerate(read_cursors):
+            values.append(
+                f"(:account_id_{i}, :other_account_id_{i}, "
+                f":last_read_message_id_{i})"
+            )
+            params |= {
+                f"account_id_{i}": read_cursor["account_id"],
+                f"other_account_id_{i}": read_cursor["other_account_id"],
+                f"last_read_message_id_{i}": read_cursor["last_read_message_id"],
+            }
+
+        query = f"""\
+            INSERT INTO read_cursors (account_id, other_account_id,
+                                      last_read_message_id)
+                 VALUES {", ".join(values)}
+                     ON DUPLICATE KEY
+                 UPDATE last_read_message_id = GREATEST(
+                            last_read_message_id,
+                            VALUES(last_read_message_id)
+                        )
+        """
+        await self.ctx.db.execute(query, params)
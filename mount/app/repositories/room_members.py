@@ -0,0 +1,103 @@
+import typing
+
+from app.common import settings
+from app.common.cache import LRUCache
+from app.common.context import Context
+
+# account id -> ids of the rooms it's a member of
+ACCOUNT_ROOMS_CACHE: LRUCache[frozenset[int]] = LRUCache(
+    name="account_rooms",
+    maxsize=settings.ROOM_CACHE_SIZE,
+    ttl=settings.ROOM_CACHE_TTL,
+)
+
+
+class RoomMembersRepo:
+    ACCOUNT_INVALIDATION_CHANNEL = "server:rooms:invalidations:accounts"
+
+    READ_PARAMS = """\
+        room_id, account_id, created_at
+    """
+
+    def __init__(self, ctx: Context) -> None:
+        self.ctx = ctx
+
+    async def _invalidate(self, account_id: int) -> None:
+        ACCOUNT_ROOMS_CACHE.delete(str(account_id))
+        await self.ctx.redis.publish(self.ACCOUNT_INVALIDATION_CHANNEL, str(account_id))
+
+    async def create(
+        self,
+        room_id: int,
+        account_id: int,
+    ) -> dict[str, typing.Any] | None:
+        query = """\
+            INSERT IGNORE INTO room_members (room_id, account_id)
+                        VALUES (:room_id, :account_id)
+        """
+        params = {
+            "room_id": room_id,
+            "account_id": account_id,
+        }
+        await self.ctx.db.execute(query, params)
+        await self._invalidate(account_id)
+
+        return await self.fetch_one(room_id, account_id)
+
+    async def fetch_one(
+        self,
+        room_id: int,
+        account_id: int,
+    ) -> dict[str, typing.Any] | None:
+        query = f"""\
+            SELECT {self.READ_PARAMS}
+              FROM room_members
+             WHERE room_id = :room_id
+               AND account_id = :account_id
+        """
+        params = {
+            "room_id": room_id,
+            "account_id": account_id,
+        }
+        rec = await self.ctx.db.fetch_one(query, params)
+        return dict(rec._mapping) if rec is not None else None
+
+    async def delete(
+        self,
+        room_id: int,
+        account_id: int,
+    ) -> dict[str, typing.Any] | None:
+        room_member = await self.fetch_one(room_id, account_id)
+        if room_member is None:
+            return None
+
+        query = """\
+            DELETE FROM room_members
+                  WHERE room_id = :room_id
+                    AND account_id = :account_id
+        """
+        params = {
+            "room_id": room_id,
+            "account_id": account_id,
+        }
+        await self.ctx.db.execute(query, params)
+        await self._invalidate(account_id)
+
+        return room_member
+
+    async def fetch_room_ids(self, account_id: int) -> frozenset[int]:
+        room_ids = ACCOUNT_ROOMS_CACHE.get(str(account_id))
+        if room_ids is not None:
+            return room_ids
+
+        query = """\
+            SELECT room_id
+              FROM room_members
+             WHERE account_id = :account_id
+        """
+        params = {"account_id": account_id}
+        recs = await self.ctx.db.fetch_all(query, params)
+
+        room_ids = frozenset(rec["room_id"] for rec in recs)
+        ACCOUNT_ROOMS_CACHE.set(str(account_id), room_ids)
+        return room_ids
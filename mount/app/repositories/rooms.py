@@ -0,0 +1,46 @@
+import typing
+
+from app.common.context import Context
+from app.models import Status
+
+
+class RoomsRepo:
+    READ_PARAMS = """\
+        id, name, owner_account_id, status, created_at, updated_at
+    """
+
+    def __init__(self, ctx: Context) -> None:
+        self.ctx = ctx
+
+    async def create(
+        self,
+        name: str,
+        owner_account_id: int,
+    ) -> dict[str, typing.Any] | None:
+        query = """\
+            INSERT INTO rooms (name, owner_account_id, status)
+                 VALUES (:name, :owner_account_id, :status)
+        """
+        params = {
+            "name": name,
+            "owner_account_id": owner_account_id,
+            "status": Status.ACTIVE,
+        }
+        insert_id = await self.ctx.db.execute(query, params)
+        assert insert_id is not None
+
+        return await self.fetch_one(insert_id)
+
+    async def fetch_one(self, room_id: int) -> dict[str, typing.Any] | None:
+        query = f"""\
+            SELECT {self.READ_PARAMS}
+              FROM rooms
+             WHERE id = :id
+               AND status = :status
+        """
+        params = {
+            "id": room_id,
+            "status": Status.ACTIVE,
+        }
+        rec = await self.ctx.db.fetch_one(query, params)
+        return dict(rec._mapping) if rec is not None else None
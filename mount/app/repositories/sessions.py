@@ -1,48 +1,159 @@
 from __future__ import annotations
 
 import json
+import struct
 import typing
 from datetime import datetime
 from datetime import timedelta
 from uuid import UUID
 
+from aioredis.client import Pipeline
+from app.common import settings
+from app.common.cache import LRUCache
 from app.common.context import Context
+from app.common.lua import LuaScript
 
 
 SESSION_EXPIRY = 60 * 60 * 24 * 30  # 30 days
 
+# version, session id, account id, expires at, created at, updated at;
+# followed by the utf-8 encoded user agent
+SESSION_FORMAT_V1 = struct.Struct("<B16sqqqq")
+
+# timestamps are stored as naive microseconds since the epoch
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+# ZRANGE over an index, skipping the (lowest scored) expired sessions which
+# haven't been reaped yet; O(log(N) + page size) unlike ZRANGEBYSCORE's LIMIT
+FETCH_UNEXPIRED_PAGE_SCRIPT = LuaScript(
+    """\
+local expired = redis.call("ZCOUNT", KEYS[1], "-inf", ARGV[1])
+return redis.call("ZRANGE", KEYS[1], expired + ARGV[2], expired + ARGV[3])
+"""
+)
+
+# drop an index's expired sessions, & forget the index once it's empty (in
+# the same step, so a session being added to it can't be missed)
+REAP_INDEX_SCRIPT = LuaScript(
+    """\
+local reaped = redis.call("ZREMRANGEBYSCORE", KEYS[1], "-inf", ARGV[1])
+if redis.call("EXISTS", KEYS[1]) == 0 then
+    redis.call("SREM", KEYS[2], KEYS[1])
+end
+return reaped
+"""
+)
+
+SESSION_CACHE: LRUCache[dict[str, typing.Any]] = LRUCache(
+    name="sessions",
+    maxsize=settings.SESSION_CACHE_SIZE,
+    ttl=settings.SESSION_CACHE_TTL,
+)
+
+
+def _to_epoch_micros(dt: datetime) -> int:
+    return (dt - _EPOCH) // _MICROSECOND
+
+
+def _from_epoch_micros(micros: int) -> datetime:
+    return _EPOCH + timedelta(0, 0, micros)
+
+
+def _deserialize_json(raw_session: bytes) -> dict[str, typing.Any]:
+    # sessions written before the binary format was introduced
+    session = json.loads(raw_session)
+    assert isinstance(session, dict)
+    session["session_id"] = UUID(session["session_id"])
+    session["account_id"] = int(session["account_id"])
+    session["expires_at"] = datetime.fromisoformat(session["expires_at"])
+    session["created_at"] = datetime.fromisoformat(session["created_at"])
+    session["updated_at"] = datetime.fromisoformat(session["updated_at"])
+    return session
+
 
 class SessionsRepo:
+    INVALIDATION_CHANNEL = "server:sessions:invalidations"
+    REAPER_LOCK_KEY = "server:sessions:reaper_lock"
+
     def __init__(self, ctx: Context) -> None:
         self.ctx = ctx
 
     @staticmethod
-    def make_key(session_id: UUID | typing.Literal["*"]) -> str:
+    def make_key(session_id: UUID | str) -> str:
         return f"server:sessions:{session_id}"
 
+    # secondary indexes; sorted sets of session ids scored by expiry
+
+    ALL_INDEX_KEY = "server:sessions:index:all"
+
+    # the set of every index key, so the reaper needn't scan for them
+    INDEX_REGISTRY_KEY = "server:sessions:index_keys"
+
     @staticmethod
-    def serialize(session: typing.Mapping[str, typing.Any]) -> str:
-        return json.dumps(
-            {
-                "session_id": str(session["session_id"]),
-                "account_id": str(session["account_id"]),
-                "user_agent": session["user_agent"],
-                "expires_at": session["expires_at"].isoformat(),
-                "created_at": session["created_at"].isoformat(),
-                "updated_at": session["updated_at"].isoformat(),
-            }
-        )
+    def make_account_index_key(account_id: int) -> str:
+        return f"server:sessions:index:accounts:{account_id}"
 
     @staticmethod
-    def deserialize(raw_session: str) -> dict[str, typing.Any]:
-        session = json.loads(raw_session)
-        assert isinstance(session, dict)
-        session["session_id"] = UUID(session["session_id"])
-        session["account_id"] = int(session["account_id"])
-        session["expires_at"] = datetime.fromisoformat(session["expires_at"])
-        session["created_at"] = datetime.fromisoformat(session["created_at"])
-        session["updated_at"] = datetime.fromisoformat(session["updated_at"])
-        return session
+    def make_user_agent_index_key(user_agent: str) -> str:
+        return f"server:sessions:index:user_agents:{user_agent}"
+
+    def _make_index_keys(self, session: typing.Mapping[str, typing.Any]) -> list[str]:
+        return [
+            self.ALL_INDEX_KEY,
+            self.make_account_index_key(session["account_id"]),
+            self.make_user_agent_index_key(session["user_agent"]),
+        ]
+
+    def _index(
+        self,
+        pipe: Pipeline,
+        session: typing.Mapping[str, typing.Any],
+    ) -> None:
+        index_keys = self._make_index_keys(session)
+        for index_key in index_keys:
+            pipe.zadd(
+                index_key,
+                {str(session["session_id"]): session["expires_at"].timestamp()},
+            )
+        pipe.sadd(self.INDEX_REGISTRY_KEY, *index_keys)
+
+    @staticmethod
+    def serialize(session: typing.Mapping[str, typing.Any]) -> bytes:
+        return SESSION_FORMAT_V1.pack(
+            1,  # format version
+            session["session_id"].bytes,
+            session["account_id"],
+            _to_epoch_micros(session["expires_at"]),
+            _to_epoch_micros(session["created_at"]),
+            _to_epoch_micros(session["updated_at"]),
+        ) + session["user_agent"].encode()
+
+    @staticmethod
+    def deserialize(raw_session: bytes) -> dict[str, typing.Any]:
+        if raw_session[:1] == b"{":
+            return _deserialize_json(raw_session)
+
+        (
+            version,
+            session_id,
+            account_id,
+            expires_at,
+            created_at,
+            updated_at,
+        ) = SESSION_FORMAT_V1.unpack_from(raw_session)
+        if version != 1:
+            # written by a newer version of the app; don't misread it
+            raise ValueError(f"Unknown session format version: {version}")
+
+        return {
+            "session_id": UUID(bytes=session_id),
+            "account_id": account_id,
+            "user_agent": raw_session[SESSION_FORMAT_V1.size :].decode(),
+            "expires_at": _from_epoch_micros(expires_at),
+            "created_at": _from_epoch_micros(created_at),
+            "updated_at": _from_epoch_micros(updated_at),
+        }
 
     async def create(
         self,
@@ -60,23 +171,100 @@ class SessionsRepo:
             "created_at": now,
             "updated_at": now,
         }
-        await self.ctx.redis.set(
-            name=self.make_key(session_id),
-            value=self.serialize(session),
-        )
-        # await self.ctx.redis.setex(
-        #     name=self.make_key(session_id),
-        #     time=SESSION_EXPIRY,
-        #     value=self.serialize(session),
-        # )
+        async with self.ctx.redis.pipeline(transaction=True) as pipe:
+            pipe.setex(
+                name=self.make_key(session_id),
+                time=SESSION_EXPIRY,
+                value=self.serialize(session),
+            )
+            self._index(pipe, session)
+            await pipe.execute()
+
         return session
 
+    async def refresh_many(
+        self,
+        sessions: typing.Sequence[typing.Mapping[str, typing.Any]],
+    ) -> list[dict[str, typing.Any]]:
+        """Push back the expiry of still-existing `sessions`, in one round trip."""
+        now = datetime.now()
+        expires_at = now + timedelta(seconds=SESSION_EXPIRY)
+
+        refreshed_sessions = [
+            {**session, "expires_at": expires_at, "updated_at": now}
+            for session in sessions
+        ]
+
+        async with self.ctx.redis.pipeline(transaction=False) as pipe:
+            for session in refreshed_sessions:
+                session_id = str(session["session_id"])
+
+                # xx; don't resurrect sessions deleted in the meantime
+                pipe.set(
+                    name=self.make_key(session_id),
+                    value=self.serialize(session),
+                    ex=SESSION_EXPIRY,
+                    xx=True,
+                )
+                for index_key in self._make_index_keys(session):
+                    pipe.zadd(index_key, {session_id: expires_at.timestamp()}, xx=True)
+
+                # other processes' caches would otherwise keep serving the
+                # old expiry until their entries aged out
+                if settings.SESSION_CACHE_ENABLED:
+                    SESSION_CACHE.delete(session_id)
+                    pipe.publish(self.INVALIDATION_CHANNEL, session_id)
+
+            await pipe.execute()
+
+        return refreshed_sessions
+
     async def fetch_one(self, session_id: UUID) -> dict[str, typing.Any] | None:
-        session_key = self.make_key(session_id)
-        session = await self.ctx.redis.get(session_key)
-        return self.deserialize(session) if session is not None else None
+        sessions = await self.fetch_many_by_ids([session_id])
+        return sessions[0] if sessions else None
 
-    # TODO: fetch_all
+    async def fetch_many_by_ids(
+        self,
+        session_ids: typing.Sequence[UUID | str],
+    ) -> list[dict[str, typing.Any]]:
+        """Fetch the sessions which exist out of `session_ids`, in order,
+        with a single round trip for any that aren't cached."""
+        sessions: dict[str, dict[str, typing.Any]] = {}
+        missing_ids = []
+
+        for session_id in map(str, session_ids):
+            session = None
+            if settings.SESSION_CACHE_ENABLED:
+                session = SESSION_CACHE.get(session_id)
+
+            if session is not None:
+                sessions[session_id] = session
+            else:
+                missing_ids.append(session_id)
+
+        if missing_ids:
+            raw_sessions = await self.ctx.redis.mget(
+                [self.make_key(session_id) for session_id in missing_ids]
+            )
+            for session_id, raw_session in zip(missing_ids, raw_sessions):
+                if raw_session is None:
+                    continue
+
+                session = self.deserialize(raw_session)
+                sessions[session_id] = session
+
+                if settings.SESSION_CACHE_ENABLED:
+                    # never serve a session from cache beyond its expiry
+                    expires_in = session["expires_at"] - datetime.now()
+                    SESSION_CACHE.set(
+                        session_id, session, ttl=expires_in.total_seconds()
+                    )
+
+        return [
+            dict(sessions[session_id])
+            for session_id in map(str, session_ids)
+            if session_id in sessions
+        ]
 
     async def fetch_many(
         self,
@@ -85,45 +273,151 @@ class SessionsRepo:
         page: int,
         page_size: int,
     ) -> list[dict[str, typing.Any]]:
-        session_key = self.make_key("*")
+        offset = (page - 1) * page_size
 
-        if page > 1:
-            cursor, keys = await self.ctx.redis.scan(
-                cursor=0,
-                match=session_key,
-                count=(page - 1) * page_size,
+        if account_id is not None and user_agent is not None:
+            # an account only has a handful of sessions; filter them here
+            # rather than maintaining an index per (account, user agent)
+            session_ids = await self.ctx.redis.zrange(
+                self.make_account_index_key(account_id), 0, -1
             )
+            sessions = [
+                session
+                for session in await self.fetch_many_by_ids(
+                    [session_id.decode() for session_id in session_ids]
+                )
+                if session["user_agent"] == user_agent
+            ]
+            return sessions[offset : offset + page_size]
+
+        if account_id is not None:
+            index_key = self.make_account_index_key(account_id)
+        elif user_agent is not None:
+            index_key = self.make_user_agent_index_key(user_agent)
         else:
-            cursor = None
-
-        sessions = []
-        while cursor != 0:
-            cursor, keys = await self.ctx.redis.scan(
-                cursor=cursor or 0,
-                match=session_key,
-                count=page_size,
-            )
+            index_key = self.ALL_INDEX_KEY
 
-            raw_sessions = await self.ctx.redis.mget(keys)
-            for raw_session in raw_sessions:
-                session = self.deserialize(raw_session)
+        session_ids = await FETCH_UNEXPIRED_PAGE_SCRIPT(
+            self.ctx.redis,
+            keys=[index_key],
+            args=[datetime.now().timestamp(), offset, offset + page_size - 1],
+        )
+        return await self.fetch_many_by_ids(
+            [session_id.decode() for session_id in session_ids]
+        )
 
-                if account_id is not None and session["account_id"] != account_id:
-                    continue
+    async def delete(self, session_id: UUID) -> dict[str, typing.Any] | None:
+        sessions = await self.delete_many([session_id])
+        return sessions[0] if sessions else None
 
-                if user_agent is not None and session["user_agent"] != user_agent:
-                    continue
+    async def delete_many(
+        self,
+        session_ids: typing.Sequence[UUID | str],
+    ) -> list[dict[str, typing.Any]]:
+        """Atomically fetch & delete the sessions which exist out of
+        `session_ids`, then clean up their index & cache entries."""
+        if not session_ids:
+            return []
+
+        session_keys = [self.make_key(session_id) for session_id in session_ids]
+
+        # GETDEL for many keys, in one round trip
+        async with self.ctx.redis.pipeline(transaction=True) as pipe:
+            pipe.mget(session_keys)
+            pipe.delete(*session_keys)
+            raw_sessions, _ = await pipe.execute()
 
-                sessions.append(session)
+        sessions = [
+            self.deserialize(raw_session)
+            for raw_session in raw_sessions
+            if raw_session is not None
+        ]
+        if not sessions:
+            return []
+
+        async with self.ctx.redis.pipeline(transaction=False) as pipe:
+            for session in sessions:
+                for index_key in self._make_index_keys(session):
+                    pipe.zrem(index_key, str(session["session_id"]))
+
+                if settings.SESSION_CACHE_ENABLED:
+                    SESSION_CACHE.delete(str(session["session_id"]))
+                    pipe.publish(self.INVALIDATION_CHANNEL, str(session["session_id"]))
+            await pipe.execute()
 
         return sessions
 
-    async def delete(self, session_id: UUID) -> dict[str, typing.Any] | None:
-        session_key = self.make_key(session_id)
+    async def delete_all(self, account_id: int) -> list[dict[str, typing.Any]]:
+        session_ids = await self.ctx.redis.zrange(
+            self.make_account_index_key(account_id), 0, -1
+        )
+        return await self.delete_many(
+            [session_id.decode() for session_id in session_ids]
+        )
+
+    async def reap_indexes(self) -> int:
+        """Remove expired sessions from the secondary indexes; the sessions
+        themselves are expired by redis. Returns the number of entries removed,
+        or -1 if another process reaped recently."""
+        acquired = await self.ctx.redis.set(
+            self.REAPER_LOCK_KEY,
+            value=b"1",
+            ex=settings.SESSION_REAP_INTERVAL,
+            nx=True,
+        )
+        if not acquired:
+            return -1
+
+        now = datetime.now().timestamp()
+        reaped = 0
+
+        async for index_key in self.ctx.redis.sscan_iter(
+            self.INDEX_REGISTRY_KEY,
+            count=1000,
+        ):
+            reaped += await REAP_INDEX_SCRIPT(
+                self.ctx.redis,
+                keys=[index_key, self.INDEX_REGISTRY_KEY],
+                args=[now],
+            )
+
+        return reaped
+
+    async def backfill_many(self, session_ids: typing.Sequence[UUID | str]) -> int:
+        """Index sessions written before the indexes existed, & give those
+        written without a TTL one, deleting any already past their expiry.
+        Returns the number of sessions indexed."""
+        if not session_ids:
+            return 0
+
+        session_keys = [self.make_key(session_id) for session_id in session_ids]
+
+        async with self.ctx.redis.pipeline(transaction=False) as pipe:
+            for session_key in session_keys:
+                pipe.get(session_key)
+                pipe.ttl(session_key)
+            results = await pipe.execute()
+
+        now = datetime.now()
+        indexed = 0
+
+        async with self.ctx.redis.pipeline(transaction=False) as pipe:
+            for session_key, raw_session, ttl in zip(
+                session_keys, results[::2], results[1::2]
+            ):
+                if raw_session is None:
+                    continue  # expired or deleted since
+
+                session = self.deserialize(raw_session)
+                if session["expires_at"] <= now:
+                    pipe.delete(session_key)
+                    continue
+
+                if ttl == -1:
+                    pipe.expireat(session_key, session["expires_at"])
+                self._index(pipe, session)
+                indexed += 1
 
-        session = await self.ctx.redis.get(session_key)
-        if session is None:
-            return None
+            await pipe.execute()
 
-        await self.ctx.redis.delete(session_key)
-        return self.deserialize(session)
+        return indexed
@@ -0,0 +1,108 @@
+import typing
+
+from app.common import settings
+from app.common.context import Context
+from app.common.lua import LuaScript
+
+# conversations with more unread messages than this are reported as having
+# exactly this many; clients show e.g. "999+"
+MAX_UNREAD_MESSAGES = 1000
+
+# KEYS: unread message ids, unread counts; ARGV: message id, sender, max,
+# ttl. both keys expire a while after the last message, so that those of
+# accounts which never come back don't stay around forever
+ADD_UNREAD_SCRIPT = LuaScript(
+    """\
+redis.call("ZADD", KEYS[1], ARGV[1], ARGV[1])
+redis.call("ZREMRANGEBYRANK", KEYS[1], 0, -(tonumber(ARGV[3]) + 1))
+redis.call("HSET", KEYS[2], ARGV[2], redis.call("ZCARD", KEYS[1]))
+redis.call("EXPIRE", KEYS[1], ARGV[4])
+redis.call("EXPIRE", KEYS[2], ARGV[4])
+"""
+)
+
+# KEYS: unread message ids, unread counts; ARGV: last read message id, sender
+MARK_READ_SCRIPT = LuaScript(
+    """\
+redis.call("ZREMRANGEBYSCORE", KEYS[1], "-inf", ARGV[1])
+local unread = redis.call("ZCARD", KEYS[1])
+if unread == 0 then
+    redis.call("HDEL", KEYS[2], ARGV[2])
+else
+    redis.call("HSET", KEYS[2], ARGV[2], unread)
+end
+return unread
+"""
+)
+
+
+class UnreadCountsRepo:
+    """Unread message counts, kept up to date as messages are sent & read.
+
+    For each conversation with unread messages, the recipient has a sorted
+    set of the unread message ids, and a hash of the sizes of those sets (by
+    sender) so that all of an account's counts can be read in one go.
+    """
+
+    def __init__(self, ctx: Context) -> None:
+        self.ctx = ctx
+
+    @staticmethod
+    def make_key(account_id: int, other_account_id: int) -> str:
+        return f"server:chat:unread:{account_id}:{other_account_id}"
+
+    @staticmethod
+    def make_counts_key(account_id: int) -> str:
+        return f"server:chat:unread_counts:{account_id}"
+
+    async def add_many(self, unread_messages: list[dict[str, typing.Any]]) -> None:
+        """Record several unread messages in one round trip."""
+        async with self.ctx.redis.pipeline(transaction=False) as pipe:
+            for unread_message in unread_messages:
+                await ADD_UNREAD_SCRIPT(
+                    pipe,
+                    keys=[
+                        self.make_key(
+                            unread_message["account_id"],
+                            unread_message["sender_account_id"],
+                        ),
+                        self.make_counts_key(unread_message["account_id"]),
+                    ],
+                    args=[
+                        unread_message["message_id"],
+                        unread_message["sender_account_id"],
+                        MAX_UNREAD_MESSAGES,
+                        settings.CHAT_UNREAD_COUNTS_TTL,
+                    ],
+                )
+            await pipe.execute()
+
+    async def mark_read_many(self, read_cursors: list[dict[str, typing.Any]]) -> None:
+        """Drop everything up to & including each cursor's last read message
+        from its account's unread messages, in one round trip."""
+        async with self.ctx.redis.pipeline(transaction=False) as pipe:
+            for read_cursor in read_cursors:
+                await MARK_READ_SCRIPT(
+                    pipe,
+                    keys=[
+                        self.make_key(
+                            read_cursor["account_id"],
+                            read_cursor["other_account_id"],
+                        ),
+                        self.make_counts_key(read_cursor["account_id"]),
+                    ],
+                    args=[
+                        read_cursor["last_read_message_id"],
+                        read_cursor["other_account_id"],
+                    ],
+                )
+            await pipe.execute()
+
+    async def fetch_all(self, account_id: int) -> dict[int, int]:
+        """Fetch an account's unread counts, by the other account in each
+        conversation. Conversations with nothing unread are left out."""
+        counts = await self.ctx.redis.hgetall(self.make_counts_key(account_id))
+        return {
+            int(other_account_id): int(count)
+            for other_account_id, count in counts.items()
+        }
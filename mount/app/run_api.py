@@ -0,0 +1,24 @@
+import uvicorn
+from app.adapters.websocket_compression import WebSocketProtocol
+from app.common import settings
+
+
+def main() -> int:
+    # run from python, since uvicorn's cli only takes its own
+    # websocket implementations, not our subclass of one
+    uvicorn.run(
+        "app.api_boot:app",
+        host=settings.APP_HOST,
+        port=settings.APP_INTERNAL_PORT,
+        access_log=False,
+        reload=settings.APP_ENV == "local",
+        ws=WebSocketProtocol,
+        # browsers answer these by themselves, & the answers keep chat
+        # connections from being timed out as idle; see `heartbeats`
+        ws_ping_interval=settings.CHAT_PING_INTERVAL,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
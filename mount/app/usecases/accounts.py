@@ -5,6 +5,7 @@ from app.common.errors import ServiceError
 from app.common.validation import validate_email
 from app.common.validation import validate_password
 from app.common.validation import validate_username
+from app.repositories.accounts import AccountExists
 from app.repositories.accounts import AccountsRepo
 
 
@@ -27,22 +28,20 @@ async def signup(
     if not validate_password(password):
         return ServiceError.ACCOUNTS_PASSWORD_INVALID
 
-    if await repo.fetch_one(email_address=email_address) is not None:
-        return ServiceError.ACCOUNTS_EMAIL_ADDRESS_EXISTS
-
-    if await repo.fetch_one(username=username) is not None:
+    # perform sign up; the unique indexes on usernames & email addresses
+    # are what check they're not taken, without a race between the two
+
+    try:
+        account = await repo.sign_up(
+            email_address=email_address,
+            password=password,
+            username=username,
+        )
+    except AccountExists as exc:
+        if exc.field == "email_address":
+            return ServiceError.ACCOUNTS_EMAIL_ADDRESS_EXISTS
         return ServiceError.ACCOUNTS_USERNAME_EXISTS
 
-    # perform sign up
-
-    account = await repo.sign_up(
-        email_address=email_address,
-        password=password,
-        username=username,
-    )
-    if account is None:
-        return ServiceError.ACCOUNTS_SIGNUP_FAILED
-
     return account
 
 
@@ -1,3 +1,4 @@
+import asyncio
 import io
 import os
 import typing
@@ -5,6 +6,7 @@ import typing
 from app.common import settings
 from app.common.context import Context
 from app.common.errors import ServiceError
+from app.common.executors import BoundedExecutor
 from app.models.avatars import Breakpoint
 from app.repositories.avatars import AvatarsRepo
 from fastapi import UploadFile
@@ -23,10 +25,45 @@ BREAKPOINTS = {
 }
 
 
+# decoding & resizing large uploads takes seconds of cpu; keep it off the loop
+AVATAR_RESIZER = BoundedExecutor(
+    name="avatars.resizer",
+    executor_type=settings.AVATAR_RESIZE_EXECUTOR,
+    max_workers=settings.AVATAR_RESIZE_MAX_WORKERS,
+)
+
+
 def _get_s3_public_url(bucket_name: str, file_path: str) -> str:
     return f"https://{bucket_name}.s3.amazonaws.com/{file_path}"
 
 
+def _resize_image(
+    file_data: bytes,
+    image_format: str,
+) -> list[tuple[Breakpoint, int, int, bytes | None]]:
+    # NOTE: runs in one of AVATAR_RESIZER's workers; the images are encoded
+    # there too, so only the (compressed) files are sent back, not bitmaps.
+    # the original is stored as uploaded, so its data isn't sent back at all
+    with io.BytesIO(file_data) as file_obj:
+        original_image = Image.open(file_obj)
+
+        resized_images: list[tuple[Breakpoint, int, int, bytes | None]] = [
+            (Breakpoint.ORIGINAL, original_image.width, original_image.height, None)
+        ]
+        for breakpoint, (width, height) in BREAKPOINTS.items():
+            if breakpoint == Breakpoint.ORIGINAL:
+                continue
+
+            resized_image = original_image.resize((width, height))
+            with io.BytesIO() as resized_file_obj:
+                resized_image.save(resized_file_obj, format=image_format)
+                resized_images.append(
+                    (breakpoint, width, height, resized_file_obj.getvalue())
+                )
+
+    return resized_images
+
+
 async def create(
     ctx: Context,
     account_id: int,
@@ -49,42 +86,52 @@ async def create(
     if len(file_data) > MAX_AVATAR_SIZE:
         return ServiceError.AVATARS_SIZE_TOO_LARGE
 
-    with io.BytesIO(file_data) as file_obj:
-        original_image = Image.open(file_obj)
-
-        avatars = []
-        for breakpoint, (width, height) in BREAKPOINTS.items():
-            if breakpoint == Breakpoint.ORIGINAL:
-                resized_image = original_image
-                width = original_image.width
-                height = original_image.height
-            else:
-                resized_image = original_image.resize((width, height))
-
-            file_name = f"{breakpoint}.{extension}"
-            public_url = _get_s3_public_url(
-                bucket_name=settings.AWS_S3_BUCKET_NAME,
-                file_path=file_name,
-            )
-
-            resized_file_data = resized_image.tobytes()
-            avatar = await repo.create(
+    resized_images = await AVATAR_RESIZER.run(
+        _resize_image,
+        file_data,
+        extension.upper(),
+    )
+
+    avatars = []
+    for breakpoint, width, height, resized_file_data in resized_images:
+        if resized_file_data is None:
+            resized_file_data = file_data
+
+        file_name = f"{breakpoint}.{extension}"
+        public_url = _get_s3_public_url(
+            bucket_name=settings.AWS_S3_BUCKET_NAME,
+            file_path=file_name,
+        )
+        avatars.append(
+            {
+                "breakpoint": breakpoint,
+                "content_type": upload_file.content_type,
+                "width": width,
+                "height": height,
+                "filesize": len(resized_file_data),
+                "public_url": public_url,
+                "file_name": file_name,
+                "file_data": resized_file_data,
+            }
+        )
+
+    await asyncio.gather(
+        *(
+            repo.upload(
                 account_id=account_id,
-                breakpoint=breakpoint,
-                content_type=upload_file.content_type,
-                width=width,
-                height=height,
-                filesize=len(resized_file_data),
-                public_url=public_url,
-                file_name=file_name,
-                file_data=resized_file_data,
+                content_type=avatar["content_type"],
+                file_name=avatar["file_name"],
+                file_data=avatar["file_data"],
             )
-            if avatar is None:
-                return ServiceError.AVATARS_CREATION_FAILED
+            for avatar in avatars
+        )
+    )
 
-            avatars.append(avatar)
+    created = await repo.create_many(account_id=account_id, avatars=avatars)
+    if len(created) != len(avatars):
+        return ServiceError.AVATARS_CREATION_FAILED
 
-    return avatars
+    return created
 
 
 async def fetch_all(
@@ -0,0 +1,136 @@
+import asyncio
+import typing
+from datetime import datetime
+
+from app.common import logger
+from app.common import settings
+from app.common.batching import WriteBehindBuffer
+from app.common.context import Context
+from app.common.errors import ServiceError
+from app.common.snowflake import SnowflakeGenerator
+from app.models import Status
+from app.repositories.chat_messages import ChatMessagesRepo
+from app.repositories.read_cursors import ReadCursorsRepo
+from app.repositories.unread_counts import UnreadCountsRepo
+
+
+async def _persist_chat_messages(
+    ctx: Context,
+    chat_messages: list[dict[str, typing.Any]],
+) -> None:
+    repo = ChatMessagesRepo(ctx)
+    await repo.create_many(chat_messages)
+
+
+# chat messages which have been delivered, waiting to be written to the db
+CHAT_MESSAGE_WRITER: WriteBehindBuffer[dict[str, typing.Any]] = WriteBehindBuffer(
+    name="chat_messages.writer",
+    flush=_persist_chat_messages,
+    max_size=settings.CHAT_MESSAGE_FLUSH_SIZE,
+    interval=settings.CHAT_MESSAGE_FLUSH_INTERVAL,
+    max_pending=settings.CHAT_MESSAGE_MAX_PENDING,
+    retry_delay=settings.CHAT_MESSAGE_FLUSH_RETRY_DELAY,
+)
+
+# the worker id is assigned at startup; see `init_chat_message_writer`
+CHAT_MESSAGE_IDS = SnowflakeGenerator()
+
+# unread count updates in flight; held so they aren't garbage collected
+_UNREAD_COUNT_UPDATES: set[asyncio.Task[None]] = set()
+
+
+def _on_unread_counts_updated(task: asyncio.Task[None]) -> None:
+    _UNREAD_COUNT_UPDATES.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Failed to update unread counts", error=task.exception())
+
+
+async def create_many(
+    ctx: Context,
+    sender_account_id: int,
+    messages: list[dict[str, typing.Any]],
+) -> list[dict[str, typing.Any]] | ServiceError:
+    """Create chat messages, to be written to the db in the background.
+
+    Each message is addressed to either a `recipient_account_id` or a
+    `room_id`. They're returned without waiting on the db (with their final
+    ids, in order), so that they can be delivered straight away; unless too
+    many are already waiting to be written, in which case none are created.
+    """
+    if not CHAT_MESSAGE_WRITER.has_room(len(messages)):
+        return ServiceError.CHAT_MESSAGES_CREATION_FAILED
+
+    chat_messages = []
+    for message in messages:
+        chat_message = {
+            "id": CHAT_MESSAGE_IDS.next_id(),
+            "sender_account_id": sender_account_id,
+            "recipient_account_id": message.get("recipient_account_id"),
+            "room_id": message.get("room_id"),
+            "message_content": message["message_content"],
+            "status": Status.ACTIVE,
+            "created_at": datetime.now(),
+        }
+        CHAT_MESSAGE_WRITER.add(chat_message)  # there's room; checked above
+        chat_messages.append(chat_message)
+
+    # unread counts are only kept for direct messages
+    unread_messages = [
+        {
+            "account_id": chat_message["recipient_account_id"],
+            "sender_account_id": sender_account_id,
+            "message_id": chat_message["id"],
+        }
+        for chat_message in chat_messages
+        if chat_message["recipient_account_id"] is not None
+    ]
+    if unread_messages:
+        # they're only a hint for clients, so the sender needn't wait on them
+        u_repo = UnreadCountsRepo(ctx)
+        task = asyncio.create_task(u_repo.add_many(unread_messages))
+        _UNREAD_COUNT_UPDATES.add(task)
+        task.add_done_callback(_on_unread_counts_updated)
+
+    return chat_messages
+
+
+async def fetch_conversation(
+    ctx: Context,
+    account_id: int,
+    other_account_id: int,
+    before: int | None,
+    limit: int,
+) -> list[dict[str, typing.Any]] | ServiceError:
+    repo = ChatMessagesRepo(ctx)
+    return await repo.fetch_conversation(
+        account_id=account_id,
+        other_account_id=other_account_id,
+        before=before,
+        limit=limit,
+    )
+
+
+async def save_read_cursors(
+    ctx: Context,
+    read_cursors: list[dict[str, typing.Any]],
+) -> list[dict[str, typing.Any]]:
+    """Move read cursors forward, and mark everything up to them as read.
+    Returns the cursors which moved."""
+    rc_repo = ReadCursorsRepo(ctx)
+    u_repo = UnreadCountsRepo(ctx)
+
+    advanced = await rc_repo.advance_many(read_cursors)
+    await u_repo.mark_read_many(read_cursors)
+    return advanced
+
+
+async def fetch_unread_counts(
+    ctx: Context,
+    account_id: int,
+) -> list[dict[str, typing.Any]] | ServiceError:
+    repo = UnreadCountsRepo(ctx)
+    unread_counts = await repo.fetch_all(account_id)
+    return [
+        {"account_id": other_account_id, "unread_count": unread_count}
+        for other_account_id, unread_count in unread_counts.items()
+    ]
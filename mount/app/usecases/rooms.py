@@ -0,0 +1,100 @@
+import typing
+
+from app.common.context import Context
+from app.common.errors import ServiceError
+from app.common.validation import validate_room_name
+from app.repositories.accounts import AccountsRepo
+from app.repositories.room_members import RoomMembersRepo
+from app.repositories.rooms import RoomsRepo
+
+
+async def create(
+    ctx: Context,
+    name: str,
+    owner_account_id: int,
+) -> dict[str, typing.Any] | ServiceError:
+    r_repo = RoomsRepo(ctx)
+    rm_repo = RoomMembersRepo(ctx)
+
+    if not validate_room_name(name):
+        return ServiceError.ROOMS_NAME_INVALID
+
+    room = await r_repo.create(name=name, owner_account_id=owner_account_id)
+    if room is None:
+        return ServiceError.ROOMS_CREATION_FAILED
+
+    # the owner is the room's first member
+    room_member = await rm_repo.create(room_id=room["id"], account_id=owner_account_id)
+    if room_member is None:
+        return ServiceError.ROOMS_CREATION_FAILED
+
+    return room
+
+
+async def fetch_one(
+    ctx: Context,
+    room_id: int,
+) -> dict[str, typing.Any] | ServiceError:
+    repo = RoomsRepo(ctx)
+    room = await repo.fetch_one(room_id)
+    if room is None:
+        return ServiceError.ROOMS_NOT_FOUND
+
+    return room
+
+
+async def join(
+    ctx: Context,
+    room_id: int,
+    account_id: int,
+    added_by_account_id: int,
+) -> dict[str, typing.Any] | ServiceError:
+    """Add an account to a room, on the say of one of its members (or its
+    owner, who may also rejoin a room they've left)."""
+    r_repo = RoomsRepo(ctx)
+    rm_repo = RoomMembersRepo(ctx)
+    a_repo = AccountsRepo(ctx)
+
+    room = await r_repo.fetch_one(room_id)
+    if room is None:
+        return ServiceError.ROOMS_NOT_FOUND
+
+    if added_by_account_id != room["owner_account_id"] and not await is_member(
+        ctx,
+        room_id=room_id,
+        account_id=added_by_account_id,
+    ):
+        return ServiceError.ROOM_MEMBERS_FORBIDDEN
+
+    if await a_repo.fetch_one(account_id=account_id) is None:
+        return ServiceError.ACCOUNTS_NOT_FOUND
+
+    room_member = await rm_repo.create(room_id=room_id, account_id=account_id)
+    if room_member is None:
+        return ServiceError.ROOM_MEMBERS_CREATION_FAILED
+
+    return room_member
+
+
+async def leave(
+    ctx: Context,
+    room_id: int,
+    account_id: int,
+) -> dict[str, typing.Any] | ServiceError:
+    repo = RoomMembersRepo(ctx)
+    room_member = await repo.delete(room_id=room_id, account_id=account_id)
+    if room_member is None:
+        return ServiceError.ROOM_MEMBERS_NOT_FOUND
+
+    return room_member
+
+
+async def fetch_room_ids(ctx: Context, account_id: int) -> frozenset[int]:
+    repo = RoomMembersRepo(ctx)
+    return await repo.fetch_room_ids(account_id)
+
+
+async def is_member(ctx: Context, room_id: int, account_id: int) -> bool:
+    # checked from the account's side; its rooms are few & cached, while a
+    # room's roster may be huge (& is invalidated by every join & leave)
+    return room_id in await fetch_room_ids(ctx, account_id)
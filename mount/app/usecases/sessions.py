@@ -1,16 +1,39 @@
 from __future__ import annotations
 
+import asyncio
 import typing
+from datetime import datetime
+from datetime import timedelta
 from uuid import UUID
 from uuid import uuid4
 
+from app.common import logger
+from app.common import settings
+from app.common.batching import WriteBehindBuffer
 from app.common.context import Context
 from app.common.errors import ServiceError
-from app.common.security import verify_password
+from app.common.security import PASSWORD_HASHER
 from app.repositories.accounts import AccountsRepo
 from app.repositories.sessions import SessionsRepo
 
 
+async def _refresh_sessions(
+    ctx: Context,
+    sessions: list[dict[str, typing.Any]],
+) -> None:
+    repo = SessionsRepo(ctx)
+    await repo.refresh_many(sessions)
+
+
+# sessions with recent activity, waiting to have their expiry pushed back
+SESSION_REFRESHER: WriteBehindBuffer[dict[str, typing.Any]] = WriteBehindBuffer(
+    name="sessions.refresher",
+    flush=_refresh_sessions,
+    max_size=settings.SESSION_REFRESH_BATCH_SIZE,
+    interval=settings.SESSION_REFRESH_FLUSH_INTERVAL,
+)
+
+
 async def login(
     ctx: Context,
     username: str,
@@ -24,7 +47,12 @@ async def login(
     if account is None:
         return ServiceError.CREDENTIALS_INCORRECT
 
-    if not verify_password(password, account["password"]):
+    # never cached, unlike the rest of the account
+    password_hash = await a_repo.fetch_password_hash(account["id"])
+    if password_hash is None:
+        return ServiceError.CREDENTIALS_INCORRECT
+
+    if not await PASSWORD_HASHER.verify_password(password, password_hash):
         return ServiceError.CREDENTIALS_INCORRECT
 
     session_id = uuid4()
@@ -48,6 +76,50 @@ async def fetch_one(
     return session
 
 
+async def authenticate(
+    ctx: Context,
+    session_id: UUID,
+) -> dict[str, typing.Any] | ServiceError:
+    """Fetch a session on behalf of its owner, counting it as activity."""
+    session = await fetch_one(ctx, session_id)
+    if isinstance(session, ServiceError):
+        return session
+
+    touch(session)
+    return session
+
+
+def touch(session: dict[str, typing.Any]) -> None:
+    """Schedule a session's expiry to be pushed back, unless that already
+    happened within the last refresh interval."""
+    if not settings.SESSION_SLIDING_EXPIRY:
+        return
+
+    now = datetime.now()
+    refresh_interval = timedelta(seconds=settings.SESSION_REFRESH_INTERVAL)
+    if now - session["updated_at"] < refresh_interval:
+        return
+
+    if not SESSION_REFRESHER.add(dict(session), key=session["session_id"]):
+        return  # tried again on the session's next use
+
+    # so that callers holding onto the session don't schedule it again
+    session["updated_at"] = now
+
+
+async def reap_forever(ctx: Context) -> None:
+    repo = SessionsRepo(ctx)
+    while True:
+        await asyncio.sleep(settings.SESSION_REAP_INTERVAL)
+        try:
+            reaped = await repo.reap_indexes()
+        except Exception as exc:
+            logger.error("Failed to reap expired sessions", error=exc)
+        else:
+            if reaped > 0:
+                logger.info("Reaped expired sessions", count=reaped)
+
+
 async def fetch_many(
     ctx: Context,
     account_id: int | None,
@@ -65,13 +137,29 @@ async def fetch_many(
     return sessions
 
 
+async def fetch_many_by_ids(
+    ctx: Context,
+    session_ids: list[UUID],
+) -> list[dict[str, typing.Any]]:
+    repo = SessionsRepo(ctx)
+    sessions = await repo.fetch_many_by_ids(session_ids)
+    return sessions
+
+
 async def logout(
     ctx: Context, session_id: UUID
 ) -> dict[str, typing.Any] | ServiceError:
     repo = SessionsRepo(ctx)
-    session = await repo.fetch_one(session_id)
+    session = await repo.delete(session_id)
     if session is None:
         return ServiceError.SESSIONS_NOT_FOUND
 
-    await repo.delete(session_id)
     return session
+
+
+async def logout_all(
+    ctx: Context, account_id: int
+) -> list[dict[str, typing.Any]]:
+    repo = SessionsRepo(ctx)
+    sessions = await repo.delete_all(account_id)
+    return sessions
@@ -0,0 +1,181 @@
+"""Wall-clock time and event loop stalls of `usecases.avatars.create`.
+
+Compares the original flow (decode & resize on the event loop, then one
+S3 upload and two database round trips per breakpoint, one after another)
+against the process pool + concurrent uploads + single transaction flow,
+with S3 and MySQL simulated by fixed round trip latencies.
+
+The event loop stall is measured by a task which wakes up every
+millisecond and records how late it was.
+
+Usage (from the directory containing `app/`):
+
+    python -m benchmarks.avatars_create
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+from app.common import settings
+from app.models.avatars import Breakpoint
+from app.usecases import avatars
+from PIL import Image
+
+
+class FakeRecord:
+    def __init__(self, mapping: dict) -> None:
+        self._mapping = mapping
+
+
+class FakeDatabase:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.last_id = 0
+
+    async def execute(self, query: str, params: dict) -> int:
+        await asyncio.sleep(self.latency)
+        self.last_id += 1
+        return self.last_id
+
+    async def fetch_one(self, query: str, params: dict) -> FakeRecord:
+        await asyncio.sleep(self.latency)
+        return FakeRecord({"id": params["id"]})
+
+    @contextlib.asynccontextmanager
+    async def transaction(self):
+        await asyncio.sleep(self.latency)  # BEGIN
+        yield
+        await asyncio.sleep(self.latency)  # COMMIT
+
+
+class FakeS3Client:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    async def put_object(self, **kwargs) -> None:
+        await asyncio.sleep(self.latency)
+
+
+class BenchmarkContext:
+    def __init__(self, db: FakeDatabase, s3_client: FakeS3Client) -> None:
+        self.db = db
+        self.s3_client = s3_client
+        self.redis = None
+
+
+class FakeUploadFile:
+    def __init__(self, file_data: bytes, content_type: str) -> None:
+        self.file = io.BytesIO(file_data)
+        self.content_type = content_type
+
+    async def seek(self, offset: int) -> None:
+        self.file.seek(offset)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self.file.read(size)
+
+
+async def sequential_create(
+    ctx: BenchmarkContext,
+    account_id: int,
+    upload_file: FakeUploadFile,
+) -> list[dict]:
+    # the implementation this replaces, minus validation
+    await upload_file.seek(0)
+    file_data = await upload_file.read()
+
+    with io.BytesIO(file_data) as file_obj:
+        original_image = Image.open(file_obj)
+
+        created = []
+        for breakpoint, (width, height) in avatars.BREAKPOINTS.items():
+            if breakpoint == Breakpoint.ORIGINAL:
+                resized_image = original_image
+            else:
+                resized_image = original_image.resize((width, height))
+
+            resized_file_data = resized_image.tobytes()
+            with io.BytesIO(resized_file_data) as resized_file_obj:
+                await ctx.s3_client.put_object(
+                    Bucket=settings.AWS_S3_BUCKET_NAME,
+                    Key=f"avatars/{account_id}/{breakpoint}.jpeg",
+                    Body=resized_file_obj,
+                    ContentType=upload_file.content_type,
+                )
+
+            insert_id = await ctx.db.execute("INSERT ...", {})
+            rec = await ctx.db.fetch_one("SELECT ...", {"id": insert_id})
+            created.append(dict(rec._mapping))
+
+    return created
+
+
+async def watch_loop(lags: list[float], stop: asyncio.Event) -> None:
+    interval = 0.001
+    while not stop.is_set():
+        before = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(max(time.perf_counter() - before - interval, 0))
+
+
+async def measure(create, args: argparse.Namespace, file_data: bytes):
+    ctx = BenchmarkContext(
+        db=FakeDatabase(latency=args.db_latency / 1e3),
+        s3_client=FakeS3Client(latency=args.s3_latency / 1e3),
+    )
+
+    elapsed = []
+    lags: list[float] = []
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(watch_loop(lags, stop))
+
+    for _ in range(args.uploads):
+        upload_file = FakeUploadFile(file_data, content_type="image/jpeg")
+        start = time.perf_counter()
+        created = await create(ctx, account_id=1, upload_file=upload_file)
+        elapsed.append(time.perf_counter() - start)
+        assert len(created) == len(avatars.BREAKPOINTS)
+
+    stop.set()
+    await watcher
+
+    # time the loop spent unable to run anything else
+    stalled = sum(lag for lag in lags if lag > 0.005)
+    return sum(elapsed) / len(elapsed), stalled / args.uploads, max(lags)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=5)
+    parser.add_argument("--size", type=int, default=3000, help="pixels")
+    parser.add_argument("--s3-latency", type=float, default=30.0, help="ms")
+    parser.add_argument("--db-latency", type=float, default=1.0, help="ms")
+    args = parser.parse_args()
+
+    image = Image.effect_noise((args.size, args.size), 64).convert("RGB")
+    with io.BytesIO() as file_obj:
+        image.save(file_obj, format="JPEG")
+        file_data = file_obj.getvalue()
+
+    avatars.AVATAR_RESIZER.start()
+
+    print(f"upload: {args.size}x{args.size} jpeg, {len(file_data) / 1e6:.1f}MB")
+    print(f"{'':>10} {'wall-clock':>12} {'stalled':>12} {'max stall':>12}")
+    for name, create in (
+        ("before", sequential_create),
+        ("after", avatars.create),
+    ):
+        wall_clock, stalled, max_stall = asyncio.run(measure(create, args, file_data))
+        print(
+            f"{name:>10} {wall_clock * 1e3:>10.1f}ms {stalled * 1e3:>10.1f}ms "
+            f"{max_stall * 1e3:>10.1f}ms"
+        )
+
+    avatars.AVATAR_RESIZER.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
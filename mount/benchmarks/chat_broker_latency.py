@@ -0,0 +1,134 @@
+"""End-to-end delivery latency of chat frames between two processes.
+
+One process owns a (fake) websocket for the target account, the other
+sends chat frames to that account through its own broker, so every frame
+crosses redis pub/sub exactly as it would between two uvicorn workers.
+
+Usage (from the directory containing `app/`, with redis-server running):
+
+    python -m benchmarks.chat_broker_latency --redis-url redis://localhost:6379
+"""
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import time
+
+import aioredis
+import orjson
+from app.api.websocket.broker import ChatBroker
+from app.api.websocket.connections import Connection
+from app.api.websocket.connections import OverflowPolicy
+from app.api.websocket.responses import Frame
+
+TARGET_ACCOUNT_ID = 2
+
+
+class FakeWebSocket:
+    def __init__(self, num_messages: int) -> None:
+        self.num_messages = num_messages
+        self.latencies: list[int] = []
+        self.done = asyncio.Event()
+
+    async def send_text(self, data: str) -> None:
+        sent_at = orjson.loads(data)["data"]["sent_at"]
+        self.latencies.append(time.monotonic_ns() - sent_at)
+        if len(self.latencies) == self.num_messages:
+            self.done.set()
+
+
+async def receiver(redis_url: str, num_messages: int, ready, results) -> None:
+    redis = aioredis.from_url(redis_url)
+    broker = ChatBroker(redis)
+    await broker.start()
+
+    websocket = FakeWebSocket(num_messages)
+    connection = Connection(
+        websocket,  # type: ignore
+        account_id=TARGET_ACCOUNT_ID,
+        max_queue_size=num_messages,
+        overflow_policy=OverflowPolicy.DISCONNECT,
+    )
+    connection.start()
+    await broker.connect(connection)
+    ready.set()
+
+    await websocket.done.wait()
+    results.put(websocket.latencies)
+
+    await connection.stop()
+    await broker.stop()
+    await redis.close()
+
+
+async def sender(redis_url: str, num_messages: int, rate: int, ready) -> None:
+    redis = aioredis.from_url(redis_url)
+    broker = ChatBroker(redis)
+    await broker.start()
+
+    while not ready.is_set():
+        await asyncio.sleep(0.01)
+
+    for _ in range(num_messages):
+        frame = Frame(
+            {
+                "message_type": "SEND_CHAT_MESSAGE",
+                "data": {
+                    "message_content": "hello world",
+                    "sender_account_id": 1,
+                    "sent_at": time.monotonic_ns(),
+                },
+            }
+        )
+        await broker.send(TARGET_ACCOUNT_ID, frame)
+        if rate:
+            await asyncio.sleep(1 / rate)
+
+    await broker.stop()
+    await redis.close()
+
+
+def run(coro_fn, *args) -> None:
+    asyncio.run(coro_fn(*args))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--rate", type=int, default=0, help="msgs/sec, 0 = max")
+    args = parser.parse_args()
+
+    ready = multiprocessing.Event()
+    results = multiprocessing.Queue()
+
+    processes = [
+        multiprocessing.Process(
+            target=run,
+            args=(receiver, args.redis_url, args.messages, ready, results),
+        ),
+        multiprocessing.Process(
+            target=run,
+            args=(sender, args.redis_url, args.messages, args.rate, ready),
+        ),
+    ]
+    for process in processes:
+        process.start()
+
+    latencies = sorted(results.get())
+    for process in processes:
+        process.join()
+
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] / 1e3
+
+    print(f"messages: {len(latencies)}")
+    print(f"mean:     {statistics.fmean(latencies) / 1e3:.1f}us")
+    print(f"p50:      {percentile(0.50):.1f}us")
+    print(f"p99:      {percentile(0.99):.1f}us")
+    print(f"max:      {latencies[-1] / 1e3:.1f}us")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,135 @@
+"""Cost of handling bulk client traffic, one packet per websocket message
+vs. many packets per (BATCH) websocket message.
+
+A single sender (e.g. a bot) sends chat messages round robin to a set of
+recipients, all connected to the same broker through fake websockets. The
+packets are decoded and handled the way `websocket_endpoint` does, and
+the CPU time per message and the number of websocket messages written to
+the recipients are reported.
+
+Usage (from the directory containing `app/`, with redis-server running):
+
+    python -m benchmarks.chat_client_batching --redis-url redis://localhost:6379
+"""
+import argparse
+import asyncio
+import time
+
+import aioredis
+import orjson
+from app.api.websocket import decoding
+from app.api.websocket.broker import ChatBroker
+from app.api.websocket.connections import Connection
+from app.api.websocket.connections import OverflowPolicy
+from app.api.websocket.v1 import chat
+from app.models import ClientMessages
+from app.usecases import chat_messages
+
+SENDER_ACCOUNT_ID = 1
+FIRST_RECIPIENT_ID = 1_000_000
+
+
+class FakeWebSocket:
+    def __init__(self) -> None:
+        self.frames_written = 0
+
+    async def send_text(self, data: str) -> None:
+        self.frames_written += 1
+
+
+class BenchmarkContext:
+    def __init__(self, redis: aioredis.Redis, chat_broker: ChatBroker) -> None:
+        self.redis = redis
+        self.chat_broker = chat_broker
+
+
+def encode_messages(args: argparse.Namespace, batch_size: int) -> list[bytes]:
+    packets = [
+        {
+            "message_type": ClientMessages.SEND_CHAT_MESSAGE,
+            "data": {
+                "message_content": "hello world",
+                "target_account_id": FIRST_RECIPIENT_ID + i % args.recipients,
+            },
+        }
+        for i in range(args.messages)
+    ]
+    if batch_size == 1:
+        return [orjson.dumps(packet) for packet in packets]
+
+    return [
+        orjson.dumps(
+            {
+                "message_type": ClientMessages.BATCH,
+                "data": {"messages": packets[i : i + batch_size]},
+            }
+        )
+        for i in range(0, len(packets), batch_size)
+    ]
+
+
+async def measure(args: argparse.Namespace, batch_size: int) -> tuple[float, int]:
+    redis = aioredis.from_url(args.redis_url)
+    broker = ChatBroker(redis)
+    await broker.start()
+    ctx = BenchmarkContext(redis, broker)
+
+    websockets = []
+    connections = []
+    for i in range(args.recipients):
+        websocket = FakeWebSocket()
+        connection = Connection(
+            websocket,  # type: ignore
+            account_id=FIRST_RECIPIENT_ID + i,
+            max_queue_size=args.messages,
+            overflow_policy=OverflowPolicy.DISCONNECT,
+        )
+        connection.start()
+        await broker.connect(connection)
+        websockets.append(websocket)
+        connections.append(connection)
+
+    encoded_messages = encode_messages(args, batch_size)
+
+    start = time.process_time()
+    for encoded in encoded_messages:
+        packets = decoding.decode(encoded)
+        await chat.handle_packets(ctx, SENDER_ACCOUNT_ID, packets)  # type: ignore
+
+    while any(not connection.queue.empty() for connection in connections):
+        await asyncio.sleep(0)
+    cpu_time = time.process_time() - start
+
+    for connection in connections:
+        await broker.disconnect(connection)
+        await connection.stop()
+    await broker.stop()
+    await redis.close()
+
+    # not running the writer; nothing to write them to
+    chat_messages.CHAT_MESSAGE_WRITER._pending.clear()
+
+    frames_written = sum(websocket.frames_written for websocket in websockets)
+    return cpu_time / args.messages, frames_written
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--recipients", type=int, default=10)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+
+    print(f"{'batch size':>10} {'cpu/message':>14} {'frames written':>16}")
+    for batch_size in args.batch_sizes:
+        cpu_per_message, frames_written = asyncio.run(measure(args, batch_size))
+        print(
+            f"{batch_size:>10} {cpu_per_message * 1e6:>12.1f}us "
+            f"{frames_written:>16}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
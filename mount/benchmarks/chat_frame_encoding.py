@@ -0,0 +1,71 @@
+"""CPU cost per chat message of fanning a frame out to N sockets.
+
+Compares re-serializing the frame with stdlib json for every recipient
+(what `WebSocket.send_json` does) against encoding it once into a `Frame`
+and handing the same text to every recipient.
+
+Usage (from the directory containing `app/`):
+
+    python -m benchmarks.chat_frame_encoding
+"""
+import argparse
+import json as stdlib_json
+import time
+
+from app.api.websocket import responses
+
+
+class FakeWebSocket:
+    def send_text(self, data: str) -> None:
+        pass
+
+
+def per_recipient(websockets: list[FakeWebSocket]) -> None:
+    frame = {
+        "message_type": "SEND_CHAT_MESSAGE",
+        "data": {
+            "message_id": 1,
+            "message_content": "hello world",
+            "sender_account_id": 1,
+        },
+    }
+    for websocket in websockets:
+        websocket.send_text(stdlib_json.dumps(frame))
+
+
+def encode_once(websockets: list[FakeWebSocket]) -> None:
+    frame = responses.chat_message(
+        message_id=1,
+        message_content="hello world",
+        sender_account_id=1,
+    )
+    for websocket in websockets:
+        websocket.send_text(frame.text)
+
+
+def measure(fn, websockets: list[FakeWebSocket], iterations: int) -> float:
+    start = time.process_time_ns()
+    for _ in range(iterations):
+        fn(websockets)
+    return (time.process_time_ns() - start) / iterations / 1e3  # us
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2_000)
+    args = parser.parse_args()
+
+    print(f"{'recipients':>10} {'per-recipient':>15} {'encode-once':>13}")
+    for num_recipients in (1, 10, 1_000):
+        websockets = [FakeWebSocket() for _ in range(num_recipients)]
+        iterations = max(args.iterations // num_recipients, 10)
+
+        before = measure(per_recipient, websockets, iterations)
+        after = measure(encode_once, websockets, iterations)
+        print(f"{num_recipients:>10} {before:>13.2f}us {after:>11.2f}us")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
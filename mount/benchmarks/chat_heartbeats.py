@@ -0,0 +1,104 @@
+"""Memory and CPU cost of heartbeating idle connections.
+
+Compares a sleeping task per connection (waking every ping interval to
+check on it) with a single `TimerWheel` holding a timer per connection,
+for the same number of idle connections. The intervals are scaled down so
+that each connection's timer fires a few times during the run.
+
+Memory is what tracemalloc sees allocated for the timers (or tasks) once
+they're all scheduled. CPU is process time over the whole run, including
+the event loop's own overhead for the tasks or the wheel.
+
+Usage (from the directory containing `app/`):
+
+    python -m benchmarks.chat_heartbeats
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from app.common.timer_wheel import TimerWheel
+
+
+class FakeConnection:
+    __slots__ = ("last_seen", "checks")
+
+    def __init__(self) -> None:
+        self.last_seen = time.monotonic()
+        self.checks = 0
+
+
+async def run_tasks(
+    connections: list[FakeConnection],
+    interval: float,
+    duration: float,
+) -> int:
+    async def heartbeat(connection: FakeConnection) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            connection.checks += 1
+
+    tracemalloc.start()
+    tasks = [asyncio.create_task(heartbeat(c)) for c in connections]
+    await asyncio.sleep(0)  # let them all get to their first sleep
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    await asyncio.sleep(duration)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return memory
+
+
+async def run_wheel(
+    connections: list[FakeConnection],
+    interval: float,
+    duration: float,
+) -> int:
+    wheel = TimerWheel(name="benchmark", tick=interval / 10, num_slots=16)
+
+    def check(connection: FakeConnection) -> None:
+        connection.checks += 1
+        wheel.schedule(interval, lambda: check(connection))
+
+    tracemalloc.start()
+    for connection in connections:
+        wheel.schedule(interval, lambda connection=connection: check(connection))
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    wheel.start()
+    await asyncio.sleep(duration)
+    await wheel.stop()
+    return memory
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connections", type=int, default=100_000)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{'strategy':>10} {'memory/conn':>12} {'cpu/check':>10} {'checks':>9}")
+    for name, run in (("tasks", run_tasks), ("wheel", run_wheel)):
+        connections = [FakeConnection() for _ in range(args.connections)]
+
+        start = time.process_time()
+        memory = asyncio.run(run(connections, args.interval, args.duration))
+        cpu_time = time.process_time() - start
+
+        checks = sum(connection.checks for connection in connections)
+        print(
+            f"{name:>10} {memory / args.connections:>11.0f}B "
+            f"{cpu_time / max(checks, 1) * 1e6:>8.2f}us {checks:>9}"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,68 @@
+"""CPU cost of decoding an inbound chat packet.
+
+Compares what `websocket_endpoint` used to do (stdlib json, then a
+`Packet` model, then the packet's data model) against `decoding.decode`,
+for each kind of packet.
+
+Usage (from the directory containing `app/`):
+
+    python -m benchmarks.chat_packet_decoding
+"""
+import argparse
+import json as stdlib_json
+import time
+
+from app.api.websocket import decoding
+from app.models import Packet
+
+PACKETS = {
+    "SEND_CHAT_MESSAGE": {
+        "message_type": "SEND_CHAT_MESSAGE",
+        "data": {"message_content": "hello world", "target_account_id": 2},
+    },
+    "MARK_AS_READ": {
+        "message_type": "MARK_AS_READ",
+        "data": {"target_account_id": 2, "message_id": 1963215204238080},
+    },
+    # pydantic coerces the id; the fast path defers to it
+    "coerced": {
+        "message_type": "SEND_CHAT_MESSAGE",
+        "data": {"message_content": "hello world", "target_account_id": "2"},
+    },
+}
+
+
+def models_decode(raw: str) -> None:
+    packet = Packet(**stdlib_json.loads(raw))
+    decoding.PACKET_MODELS[packet.message_type](**packet.data)
+
+
+def fast_decode(raw: str) -> None:
+    decoding.decode(raw)
+
+
+def measure(fn, raw: str, iterations: int) -> float:
+    start = time.process_time_ns()
+    for _ in range(iterations):
+        fn(raw)
+    return (time.process_time_ns() - start) / iterations / 1e3  # us
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{'packet':>18} {'models':>10} {'decode':>10}")
+    for name, packet in PACKETS.items():
+        raw = stdlib_json.dumps(packet)
+
+        before = measure(models_decode, raw, args.iterations)
+        after = measure(fast_decode, raw, args.iterations)
+        print(f"{name:>18} {before:>8.2f}us {after:>8.2f}us")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
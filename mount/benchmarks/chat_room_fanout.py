@@ -0,0 +1,134 @@
+"""Room message throughput: a publish per member vs. a publish per room.
+
+Two brokers share one redis, standing in for two processes: the receiving
+broker owns a (fake) websocket for every member of the room, the sending
+broker owns none. Each message is sent either to every member's account
+channel in turn (the way a group chat would have to be built from direct
+messages) or once to the room's channel through `ChatBroker.send_to_room`,
+and is timed until it has been written to every member's websocket.
+
+Usage (from the directory containing `app/`, with redis-server running):
+
+    python -m benchmarks.chat_room_fanout --redis-url redis://localhost:6379
+"""
+import argparse
+import asyncio
+import time
+
+import aioredis
+from app.api.websocket.broker import ChatBroker
+from app.api.websocket.connections import Connection
+from app.api.websocket.connections import OverflowPolicy
+from app.api.websocket.responses import Frame
+
+ROOM_ID = 1
+FIRST_ACCOUNT_ID = 1_000_000
+
+
+class FakeWebSocket:
+    def __init__(self, counter: "DeliveryCounter") -> None:
+        self.counter = counter
+
+    async def send_text(self, data: str) -> None:
+        self.counter.delivered()
+
+
+class DeliveryCounter:
+    def __init__(self) -> None:
+        self.expected = 0
+        self.count = 0
+        self.done = asyncio.Event()
+
+    def expect(self, expected: int) -> None:
+        self.expected = expected
+        self.count = 0
+        self.done.clear()
+
+    def delivered(self) -> None:
+        self.count += 1
+        if self.count == self.expected:
+            self.done.set()
+
+
+async def per_member_send(broker: ChatBroker, member_ids: list[int], frame: Frame):
+    for account_id in member_ids:
+        await broker.send(account_id, frame)
+
+
+async def room_send(broker: ChatBroker, member_ids: list[int], frame: Frame):
+    await broker.send_to_room(ROOM_ID, frame)
+
+
+async def measure(redis_url: str, room_size: int, num_messages: int) -> list[float]:
+    redis = aioredis.from_url(redis_url)
+    receiver = ChatBroker(redis)
+    sender = ChatBroker(redis)
+    await receiver.start()
+    await sender.start()
+
+    counter = DeliveryCounter()
+    member_ids = list(range(FIRST_ACCOUNT_ID, FIRST_ACCOUNT_ID + room_size))
+    connections = []
+    for account_id in member_ids:
+        connection = Connection(
+            FakeWebSocket(counter),  # type: ignore
+            account_id=account_id,
+            max_queue_size=num_messages,
+            overflow_policy=OverflowPolicy.DISCONNECT,
+        )
+        connection.start()
+        await receiver.connect(connection, room_ids=[ROOM_ID])
+        connections.append(connection)
+
+    frame = Frame(
+        {
+            "message_type": "SEND_ROOM_MESSAGE",
+            "data": {
+                "message_content": "hello world",
+                "sender_account_id": 1,
+                "room_id": ROOM_ID,
+            },
+        }
+    )
+
+    rates = []
+    for send in (per_member_send, room_send):
+        counter.expect(room_size * num_messages)
+        start = time.perf_counter()
+        for _ in range(num_messages):
+            await send(sender, member_ids, frame)
+        await counter.done.wait()
+        rates.append(num_messages / (time.perf_counter() - start))
+
+    for connection in connections:
+        await receiver.disconnect(connection)
+        await connection.stop()
+    await sender.stop()
+    await receiver.stop()
+    await redis.close()
+    return rates
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument(
+        "--room-sizes",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1_000, 10_000],
+    )
+    args = parser.parse_args()
+
+    print(f"{'members':>8} {'per member':>14} {'per room':>14}")
+    for room_size in args.room_sizes:
+        per_member, per_room = asyncio.run(
+            measure(args.redis_url, room_size, args.messages)
+        )
+        print(f"{room_size:>8} {per_member:>10.1f}/sec {per_room:>10.1f}/sec")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,69 @@
+"""Size and CPU cost of chat frames in each wire protocol.
+
+For an outbound chat message and an inbound SEND_CHAT_MESSAGE packet,
+reports the encoded size, the cost of encoding a `Frame` (once, however
+many recipients share it) and the cost of `decoding.decode`, per protocol.
+
+Usage (from the directory containing `app/`):
+
+    python -m benchmarks.chat_wire_protocols
+"""
+import argparse
+import time
+
+import msgpack
+import orjson
+from app.api.websocket import decoding
+from app.api.websocket import responses
+from app.api.websocket.protocols import Protocol
+
+INBOUND_PACKET = {
+    "message_type": "SEND_CHAT_MESSAGE",
+    "data": {"message_content": "hello world", "target_account_id": 1963215},
+}
+
+
+def encode_frame(protocol: Protocol) -> bytes | str:
+    frame = responses.chat_message(
+        message_id=1963215204238080,
+        message_content="hello world",
+        sender_account_id=1963215,
+    )
+    return frame.msgpack if protocol is Protocol.MSGPACK else frame.text
+
+
+def measure(fn, iterations: int) -> float:
+    start = time.process_time_ns()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time_ns() - start) / iterations / 1e3  # us
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(
+        f"{'protocol':>16} {'out size':>9} {'encode':>9} "
+        f"{'in size':>8} {'decode':>9}"
+    )
+    for protocol in Protocol:
+        if protocol is Protocol.MSGPACK:
+            raw = msgpack.packb(INBOUND_PACKET)
+        else:
+            raw = orjson.dumps(INBOUND_PACKET)
+
+        encoded = encode_frame(protocol)
+        encode = measure(lambda: encode_frame(protocol), args.iterations)
+        decode = measure(lambda: decoding.decode(raw, protocol), args.iterations)
+        print(
+            f"{protocol.value:>16} {len(encoded):>8}B {encode:>7.2f}us "
+            f"{len(raw):>7}B {decode:>7.2f}us"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,153 @@
+"""Requests/sec through the HTTP middleware stack, before and after.
+
+Serves a trivial endpoint that reads `request.state`, behind:
+
+- "base_http": the `@app.middleware("http")` functions `init_middlewares`
+  used to register (db checkout, redis, s3 & process time), each a
+  `BaseHTTPMiddleware`
+- "asgi": the single `RequestStateMiddleware`
+
+Requests are made in-process through the ASGI interface, with no sockets
+or HTTP parsing involved, so the difference is all middleware. The db
+"pool" hands out connections instantly, so its cost here is the layer's
+alone.
+
+Usage (from the directory containing `app/`):
+
+    python -m benchmarks.http_middlewares
+"""
+import argparse
+import asyncio
+import contextlib
+import time
+
+from app.api.middlewares import RequestStateMiddleware
+from fastapi import FastAPI
+from fastapi import Request
+
+
+class FakeDatabase:
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        yield object()
+
+
+def make_app(name: str) -> FastAPI:
+    app = FastAPI()
+    app.state.db = FakeDatabase()
+    app.state.redis = object()
+    app.state.s3_client = object()
+
+    @app.get("/")
+    async def endpoint(request: Request):
+        assert request.state.redis is request.app.state.redis
+        return {"status": "success"}
+
+    if name == "asgi":
+        app.add_middleware(RequestStateMiddleware)
+        return app
+
+    @app.middleware("http")
+    async def add_db_to_request(request: Request, call_next):
+        async with request.app.state.db.connection() as conn:
+            request.state.db = conn
+            response = await call_next(request)
+        return response
+
+    @app.middleware("http")
+    async def add_redis_to_request(request: Request, call_next):
+        request.state.redis = request.app.state.redis
+        response = await call_next(request)
+        return response
+
+    @app.middleware("http")
+    async def add_s3_client_to_request(request: Request, call_next):
+        request.state.s3_client = request.app.state.s3_client
+        response = await call_next(request)
+        return response
+
+    @app.middleware("http")
+    async def add_process_time_header(request: Request, call_next):
+        start_time = time.perf_counter_ns()
+        response = await call_next(request)
+        process_time = (time.perf_counter_ns() - start_time) / 1e6
+        response.headers["X-Process-Time"] = str(process_time)  # ms
+        return response
+
+    return app
+
+
+async def request(app: FastAPI) -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/",
+        "raw_path": b"/",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("127.0.0.1", 80),
+    }
+    sent = []
+    received = False
+    response_complete = asyncio.Event()
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        # as a server would, once the response has been sent
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+        if message["type"] == "http.response.body" and not message.get(
+            "more_body", False
+        ):
+            response_complete.set()
+
+    await app(scope, receive, send)
+
+    headers = dict(sent[0]["headers"])
+    assert sent[0]["status"] == 200 and b"x-process-time" in headers
+
+
+async def measure(app: FastAPI, num_requests: int, concurrency: int) -> float:
+    async def worker(n: int) -> None:
+        for _ in range(n):
+            await request(app)
+
+    await request(app)  # warm up
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(worker(num_requests // concurrency) for _ in range(concurrency))
+    )
+    return num_requests / (time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'middleware':>10} {'requests/sec':>13}")
+    for name in ("base_http", "asgi"):
+        rps = asyncio.run(
+            measure(make_app(name), args.requests, args.concurrency)
+        )
+        print(f"{name:>10} {rps:>13.0f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,144 @@
+"""Chat delivery latency on a worker while logins are in flight.
+
+A chat frame is sent to a (fake) websocket every few milliseconds, while
+a number of concurrent logins check bcrypt passwords back to back on the
+same event loop, either inline (as `login` used to) or through the
+`PasswordHasher` pool.
+
+Usage (from the directory containing `app/`):
+
+    python -m benchmarks.password_hashing_latency
+"""
+import argparse
+import asyncio
+import time
+
+import orjson
+from app.api.websocket.connections import Connection
+from app.api.websocket.connections import OverflowPolicy
+from app.api.websocket.responses import Frame
+from app.common import metrics
+from app.common import security
+
+
+class FakeWebSocket:
+    def __init__(self) -> None:
+        self.latencies: list[int] = []
+
+    async def send_text(self, data: str) -> None:
+        sent_at = orjson.loads(data)["data"]["sent_at"]
+        self.latencies.append(time.monotonic_ns() - sent_at)
+
+
+async def chat(connection: Connection, duration: float, interval: float) -> int:
+    # frames are due on a fixed schedule, and any that came due while the
+    # event loop was blocked are sent as soon as it frees up, so the stall
+    # shows up as latency rather than as fewer frames
+    due_at = time.monotonic_ns()
+    deadline = due_at + int(duration * 1e9)
+    num_sent = 0
+    while due_at < deadline:
+        delay = due_at - time.monotonic_ns()
+        if delay > 0:
+            await asyncio.sleep(delay / 1e9)
+
+        frame = Frame(
+            {
+                "message_type": "SEND_CHAT_MESSAGE",
+                "data": {
+                    "message_content": "hello world",
+                    "sender_account_id": 1,
+                    "sent_at": due_at,
+                },
+            }
+        )
+        connection.send(frame)
+        num_sent += 1
+        due_at += int(interval * 1e9)
+
+    return num_sent
+
+
+async def logins(mode: str, hashed_password: str, stop: asyncio.Event) -> int:
+    num_logins = 0
+    while not stop.is_set():
+        if mode == "inline":
+            security.verify_password("password", hashed_password)
+            await asyncio.sleep(0)
+        else:
+            await security.PASSWORD_HASHER.verify_password(
+                "password", hashed_password
+            )
+        num_logins += 1
+    return num_logins
+
+
+async def measure(mode: str, args: argparse.Namespace, hashed_password: str):
+    websocket = FakeWebSocket()
+    connection = Connection(
+        websocket,  # type: ignore
+        account_id=1,
+        max_queue_size=1_000_000,
+        overflow_policy=OverflowPolicy.DISCONNECT,
+    )
+    connection.start()
+
+    stop = asyncio.Event()
+    login_tasks = []
+    if mode != "idle":
+        login_tasks = [
+            asyncio.create_task(logins(mode, hashed_password, stop))
+            for _ in range(args.concurrency)
+        ]
+
+    start = time.perf_counter()
+    num_sent = await chat(connection, args.duration, args.interval)
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    num_logins = sum(await asyncio.gather(*login_tasks))
+
+    while len(websocket.latencies) < num_sent:
+        await asyncio.sleep(0.01)
+    await connection.stop()
+
+    latencies = sorted(websocket.latencies)
+    return latencies, num_logins / elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds")
+    parser.add_argument("--interval", type=float, default=0.005, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=16, help="logins")
+    args = parser.parse_args()
+
+    hashed_password = security.hash_password("password").decode()
+    security.PASSWORD_HASHER.start()
+
+    print(f"{'logins':>8} {'p50':>10} {'p99':>10} {'max':>10} {'logins/s':>9}")
+    for mode in ("idle", "inline", "executor"):
+        latencies, login_rate = asyncio.run(measure(mode, args, hashed_password))
+
+        def percentile(p: float) -> float:
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] / 1e6
+
+        print(
+            f"{mode:>8} {percentile(0.50):>8.2f}ms {percentile(0.99):>8.2f}ms "
+            f"{latencies[-1] / 1e6:>8.2f}ms {login_rate:>9.1f}"
+        )
+
+    security.PASSWORD_HASHER.stop()
+
+    queue_time = metrics.snapshot()["summaries"][
+        f"{security.PASSWORD_HASHER.name}.queue_time_ms"
+    ]
+    print(
+        f"executor queue time: mean {queue_time['sum'] / queue_time['count']:.1f}ms, "
+        f"max {queue_time['max']:.1f}ms"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
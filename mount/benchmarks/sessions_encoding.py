@@ -0,0 +1,67 @@
+"""Size and decode cost of a stored session: legacy JSON vs. binary.
+
+Usage (from the directory containing `app/`):
+
+    python -m benchmarks.sessions_encoding
+"""
+import argparse
+import json
+import time
+from datetime import datetime
+from datetime import timedelta
+from uuid import uuid4
+
+from app.repositories.sessions import SESSION_EXPIRY
+from app.repositories.sessions import SessionsRepo
+
+
+def serialize_json(session: dict) -> bytes:
+    # the JSON format sessions were stored in before the binary one
+    return json.dumps(
+        {
+            "session_id": str(session["session_id"]),
+            "account_id": str(session["account_id"]),
+            "user_agent": session["user_agent"],
+            "expires_at": session["expires_at"].isoformat(),
+            "created_at": session["created_at"].isoformat(),
+            "updated_at": session["updated_at"].isoformat(),
+        }
+    ).encode()
+
+
+def measure_decode(raw_session: bytes, iterations: int) -> float:
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        SessionsRepo.deserialize(raw_session)
+    return (time.perf_counter_ns() - start) / iterations / 1e3  # us
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    now = datetime.now()
+    session = {
+        "session_id": uuid4(),
+        "account_id": 123_456,
+        "user_agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X)",
+        "expires_at": now + timedelta(seconds=SESSION_EXPIRY),
+        "created_at": now,
+        "updated_at": now,
+    }
+
+    legacy = serialize_json(session)
+    binary = SessionsRepo.serialize(session)
+    assert SessionsRepo.deserialize(legacy) == SessionsRepo.deserialize(binary)
+
+    print(f"{'format':>8} {'bytes':>6} {'decode':>9}")
+    for name, raw_session in (("json", legacy), ("binary", binary)):
+        decode_time = measure_decode(raw_session, args.iterations)
+        print(f"{name:>8} {len(raw_session):>6} {decode_time:>7.2f}us")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,153 @@
+"""`GET /v1/sessions?account_id=` latency: SCAN vs. secondary indexes.
+
+Seeds a local redis with sessions spread across many accounts, then times
+one page of an account's sessions through the original SCAN + MGET +
+filter approach and through `SessionsRepo.fetch_many`'s index lookup.
+
+Usage (from the directory containing `app/`, with redis-server running).
+The redis url must be given explicitly, & should point at a scratch
+database; it refuses to run against one which already has sessions, and
+deletes only the session keys it wrote once it's done:
+
+    python -m benchmarks.sessions_fetch_many --redis-url redis://localhost:6379/15
+"""
+import argparse
+import asyncio
+import random
+import time
+from uuid import uuid4
+
+import aioredis
+from aioredis import Redis
+from app.common.context import Context
+from app.repositories.sessions import SessionsRepo
+
+
+class BenchmarkContext(Context):
+    def __init__(self, redis: Redis) -> None:
+        self._redis = redis
+
+    @property
+    def db(self):
+        raise NotImplementedError
+
+    @property
+    def redis(self) -> Redis:
+        return self._redis
+
+    @property
+    def s3_client(self):
+        raise NotImplementedError
+
+
+async def scan_fetch_many(
+    redis: Redis,
+    account_id: int,
+    page_size: int,
+) -> list[dict]:
+    # the SCAN-based implementation this replaces (first page only)
+    sessions = []
+    cursor = None
+    while cursor != 0:
+        cursor, keys = await redis.scan(
+            cursor=cursor or 0,
+            match=SessionsRepo.make_key("*"),
+            count=page_size,
+        )
+        keys = [key for key in keys if b":index:" not in key]
+        if not keys:
+            continue
+
+        for raw_session in await redis.mget(keys):
+            if raw_session is None:  # not a string; e.g. the index registry
+                continue
+            session = SessionsRepo.deserialize(raw_session)
+            if session["account_id"] == account_id:
+                sessions.append(session)
+
+    return sessions[:page_size]
+
+
+async def seed(repo: SessionsRepo, num_sessions: int, num_accounts: int) -> None:
+    batch_size = 100
+    for start in range(0, num_sessions, batch_size):
+        await asyncio.gather(
+            *(
+                repo.create(
+                    session_id=uuid4(),
+                    account_id=random.randint(1, num_accounts),
+                    user_agent=random.choice(("android", "ios", "web")),
+                )
+                for _ in range(min(batch_size, num_sessions - start))
+            )
+        )
+
+
+async def delete_sessions(redis: Redis) -> None:
+    # every key the sessions repo writes (sessions, indexes, ...) is under
+    # its prefix, so this leaves anything else in the database alone
+    keys = []
+    async for key in redis.scan_iter(match=SessionsRepo.make_key("*"), count=1000):
+        keys.append(key)
+        if len(keys) >= 1000:
+            await redis.unlink(*keys)
+            keys = []
+    if keys:
+        await redis.unlink(*keys)
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    redis = aioredis.from_url(args.redis_url)
+    async for _ in redis.scan_iter(match=SessionsRepo.make_key("*"), count=1000):
+        print(f"{args.redis_url} already has sessions; use a scratch database")
+        await redis.close()
+        return 1
+
+    try:
+        await run(redis, args)
+    finally:
+        await delete_sessions(redis)
+        await redis.close()
+
+    return 0
+
+
+async def run(redis: Redis, args: argparse.Namespace) -> None:
+    repo = SessionsRepo(BenchmarkContext(redis))
+    await seed(repo, args.sessions, args.accounts)
+
+    account_ids = [random.randint(1, args.accounts) for _ in range(args.requests)]
+
+    start = time.perf_counter()
+    for account_id in account_ids[: max(args.requests // 100, 1)]:
+        await scan_fetch_many(redis, account_id, page_size=10)
+    scan_elapsed = (time.perf_counter() - start) / max(args.requests // 100, 1)
+
+    start = time.perf_counter()
+    for account_id in account_ids:
+        await repo.fetch_many(
+            account_id=account_id,
+            user_agent=None,
+            page=1,
+            page_size=10,
+        )
+    index_elapsed = (time.perf_counter() - start) / args.requests
+
+    print(f"sessions: {args.sessions}, accounts: {args.accounts}")
+    print(f"scan:     {scan_elapsed * 1e3:.2f}ms/request")
+    print(f"index:    {index_elapsed * 1e3:.2f}ms/request")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--redis-url", required=True)
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--accounts", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=1_000)
+    args = parser.parse_args()
+
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,156 @@
+"""Bytes on the wire and CPU per message of permessage-deflate settings.
+
+Replays representative outbound chat traffic (chat messages of varied
+lengths, read receipts & the odd offline replay batch, as JSON text
+frames) through `ThresholdPerMessageDeflate` under different settings,
+and checks that a client-side decoder gets the original frames back.
+
+Bytes include the websocket frame header (but not TCP/TLS overhead).
+Memory is zlib's documented usage for a connection's compressor and
+decompressor, held for the connection's lifetime with context takeover
+(and only while a message is being compressed without).
+
+Usage (from the directory containing `app/`):
+
+    python -m benchmarks.websocket_compression
+"""
+import argparse
+import random
+import string
+import time
+
+from app.adapters.websocket_compression import ThresholdPerMessageDeflate
+from app.api.websocket import responses
+from websockets import frames
+from websockets.extensions.permessage_deflate import PerMessageDeflate
+
+CONFIGS = {
+    # name: (context takeover, max window bits, memory level, min size)
+    "uncompressed": None,
+    "deflate": (True, 15, 8, 0),
+    "deflate >=64B": (True, 15, 8, 64),
+    "deflate >=128B": (True, 15, 8, 128),
+    "deflate >=256B": (True, 15, 8, 256),
+    "deflate 12 bits": (True, 12, 8, 0),
+    "deflate 9 bits": (True, 9, 8, 0),
+    "deflate memlevel 4": (True, 15, 4, 0),
+    "12 bits memlevel 5": (True, 12, 5, 0),
+    "12 bits 5 >=64B": (True, 12, 5, 64),
+    "no takeover": (False, 15, 8, 0),
+    "no takeover >=256B": (False, 15, 8, 256),
+}
+
+WORDS = ["hey", "lol", "ok", "see you", "what", "tomorrow", "sounds good", "haha"]
+
+
+def make_traffic(num_messages: int) -> list[bytes]:
+    rng = random.Random(0)
+    message_id = 1963215204238080
+
+    traffic = []
+    for _ in range(num_messages):
+        message_id += rng.randint(1, 5000)
+        kind = rng.random()
+        if kind < 0.75:
+            words = rng.choices(WORDS, k=rng.choice((1, 2, 3, 8, 30)))
+            if rng.random() < 0.1:  # links, codes, etc.
+                words.append("".join(rng.choices(string.ascii_letters, k=24)))
+            frame = responses.chat_message(
+                message_id=message_id,
+                message_content=" ".join(words),
+                sender_account_id=rng.randint(1, 100_000),
+            )
+        elif kind < 0.98:
+            frame = responses.read_receipt(
+                reader_account_id=rng.randint(1, 100_000),
+                message_id=message_id,
+            )
+        else:
+            frame = responses.batch(
+                [
+                    responses.chat_message(
+                        message_id=message_id + i,
+                        message_content=" ".join(rng.choices(WORDS, k=4)),
+                        sender_account_id=rng.randint(1, 100_000),
+                    ).encoded
+                    for i in range(rng.randint(5, 50))
+                ]
+            )
+        traffic.append(frame.encoded)
+
+    return traffic
+
+
+def header_size(payload_size: int) -> int:
+    if payload_size < 126:
+        return 2
+    elif payload_size < 65536:
+        return 4
+    return 10
+
+
+def zlib_memory(window_bits: int, memory_level: int) -> int:
+    compressor = (1 << (window_bits + 2)) + (1 << (memory_level + 9))
+    decompressor = 1 << window_bits
+    return compressor + decompressor
+
+
+def measure(traffic: list[bytes], config) -> tuple[float, float]:
+    if config is None:
+        wire_bytes = sum(len(data) + header_size(len(data)) for data in traffic)
+        return wire_bytes / len(traffic), 0.0
+
+    context_takeover, window_bits, memory_level, min_size = config
+    encoder = ThresholdPerMessageDeflate(
+        not context_takeover,
+        not context_takeover,
+        window_bits,
+        window_bits,
+        {"memLevel": memory_level},
+        min_size=min_size,
+    )
+    decoder = PerMessageDeflate(
+        not context_takeover,
+        not context_takeover,
+        window_bits,
+        window_bits,
+    )
+
+    encoded = []
+    start = time.process_time_ns()
+    for data in traffic:
+        encoded.append(encoder.encode(frames.Frame(frames.OP_TEXT, data)))
+    cpu_time = time.process_time_ns() - start
+
+    wire_bytes = 0
+    for data, frame in zip(traffic, encoded):
+        wire_bytes += len(frame.data) + header_size(len(frame.data))
+        assert decoder.decode(frame).data == data
+
+    return wire_bytes / len(traffic), cpu_time / len(traffic) / 1e3  # us
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=20_000)
+    args = parser.parse_args()
+
+    traffic = make_traffic(args.messages)
+
+    print(
+        f"{'settings':>20} {'bytes/message':>14} {'cpu/message':>12} "
+        f"{'memory/conn':>12}"
+    )
+    for name, config in CONFIGS.items():
+        wire_bytes, cpu_time = measure(traffic, config)
+        memory = zlib_memory(config[1], config[2]) if config is not None else 0
+        print(
+            f"{name:>20} {wire_bytes:>13.1f}B {cpu_time:>10.2f}us "
+            f"{memory / 1024:>10.0f}KB"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1 @@
+DROP TABLE chat_messages;
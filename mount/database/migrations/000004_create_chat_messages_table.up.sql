@@ -0,0 +1,9 @@
+CREATE TABLE chat_messages (
+    id BIGINT NOT NULL PRIMARY KEY,
+    sender_account_id INT NOT NULL,
+    recipient_account_id INT NOT NULL,
+    message_content MEDIUMTEXT NOT NULL,
+    status VARCHAR(16) NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
@@ -0,0 +1,4 @@
+ALTER TABLE chat_messages
+    DROP INDEX chat_messages_conversation_idx,
+    DROP COLUMN conversation_high,
+    DROP COLUMN conversation_low;
@@ -0,0 +1,5 @@
+-- a conversation is identified by its two participants, in either order
+ALTER TABLE chat_messages
+    ADD COLUMN conversation_low INT AS (LEAST(sender_account_id, recipient_account_id)) VIRTUAL,
+    ADD COLUMN conversation_high INT AS (GREATEST(sender_account_id, recipient_account_id)) VIRTUAL,
+    ADD INDEX chat_messages_conversation_idx (conversation_low, conversation_high, id);
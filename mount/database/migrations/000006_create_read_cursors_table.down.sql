@@ -0,0 +1 @@
+DROP TABLE read_cursors;
@@ -0,0 +1,8 @@
+CREATE TABLE read_cursors (
+    account_id INT NOT NULL,
+    other_account_id INT NOT NULL,
+    last_read_message_id BIGINT NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (account_id, other_account_id)
+);
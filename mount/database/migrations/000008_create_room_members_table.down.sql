@@ -0,0 +1 @@
+DROP TABLE room_members;
@@ -0,0 +1,7 @@
+CREATE TABLE room_members (
+    room_id INT NOT NULL,
+    account_id INT NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (room_id, account_id),
+    INDEX room_members_account_idx (account_id)
+);
@@ -0,0 +1,9 @@
+-- room messages have no recipient, so can't survive the column becoming
+-- NOT NULL again
+DELETE FROM chat_messages
+      WHERE room_id IS NOT NULL;
+
+ALTER TABLE chat_messages
+    DROP INDEX chat_messages_room_idx,
+    DROP COLUMN room_id,
+    MODIFY COLUMN recipient_account_id INT NOT NULL;
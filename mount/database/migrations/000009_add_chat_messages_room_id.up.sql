@@ -0,0 +1,5 @@
+-- messages sent to a room have a room instead of a recipient
+ALTER TABLE chat_messages
+    MODIFY COLUMN recipient_account_id INT NULL,
+    ADD COLUMN room_id INT NULL AFTER recipient_account_id,
+    ADD INDEX chat_messages_room_idx (room_id, id);
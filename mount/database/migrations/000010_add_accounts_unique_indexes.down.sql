@@ -0,0 +1,3 @@
+ALTER TABLE accounts
+    DROP INDEX accounts_email_address_uidx,
+    DROP INDEX accounts_username_uidx;
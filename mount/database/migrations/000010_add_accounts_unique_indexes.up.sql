@@ -0,0 +1,6 @@
+-- usernames & email addresses identify accounts, for logins & signup's
+-- existence checks; this fails if there are already duplicates, which
+-- need resolving by hand first
+ALTER TABLE accounts
+    ADD UNIQUE INDEX accounts_username_uidx (username),
+    ADD UNIQUE INDEX accounts_email_address_uidx (email_address);
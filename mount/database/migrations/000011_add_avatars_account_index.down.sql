@@ -0,0 +1,2 @@
+ALTER TABLE avatars
+    DROP INDEX avatars_account_status_breakpoint_idx;
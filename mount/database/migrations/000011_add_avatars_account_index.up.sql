@@ -0,0 +1,3 @@
+-- avatars are always looked up by account & status, & often by breakpoint
+ALTER TABLE avatars
+    ADD INDEX avatars_account_status_breakpoint_idx (account_id, status, breakpoint);
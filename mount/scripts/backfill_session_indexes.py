@@ -0,0 +1,93 @@
+"""One-off backfill of the session indexes, for sessions written before them.
+
+Sessions created before the secondary indexes were introduced aren't in
+them (so `GET /v1/sessions` can't find them), and those created before
+sessions expired were written without a TTL. This scans every session key
+once, indexing each live session (idempotently, so re-running it is safe),
+giving those without a TTL one at their `expires_at`, and deleting any
+already past it.
+
+Usage (from the directory containing `app/`, with the app's environment):
+
+    python -m scripts.backfill_session_indexes
+"""
+import argparse
+import asyncio
+import time
+from uuid import UUID
+
+import aioredis
+from aioredis import Redis
+from app.common import logger
+from app.common import settings
+from app.repositories.sessions import SessionsRepo
+
+
+class ScriptContext:
+    # the sessions repo only needs redis
+    def __init__(self, redis: Redis) -> None:
+        self.redis = redis
+
+
+def parse_session_id(key: bytes) -> str | None:
+    # the index keys (& others) share the sessions' prefix
+    session_id = key.decode().removeprefix(SessionsRepo.make_key(""))
+    try:
+        UUID(session_id)
+    except ValueError:
+        return None
+    return session_id
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    redis = aioredis.from_url(f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}")
+    repo = SessionsRepo(ScriptContext(redis))
+
+    start = time.perf_counter()
+    scanned = indexed = 0
+
+    session_ids: list[str] = []
+    async for key in redis.scan_iter(match=SessionsRepo.make_key("*"), count=1000):
+        session_id = parse_session_id(key)
+        if session_id is None:
+            continue
+
+        session_ids.append(session_id)
+        if len(session_ids) >= args.batch_size:
+            scanned += len(session_ids)
+            indexed += await repo.backfill_many(session_ids)
+            session_ids = []
+            logger.info(
+                "Backfilling session indexes",
+                indexed=indexed,
+                scanned=scanned,
+            )
+
+    scanned += len(session_ids)
+    indexed += await repo.backfill_many(session_ids)
+
+    logger.info(
+        "Backfilled session indexes",
+        indexed=indexed,
+        scanned=scanned,
+        elapsed=round(time.perf_counter() - start, 3),
+    )
+    await redis.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    args = parser.parse_args()
+
+    logger.configure_logging(
+        app_env=settings.APP_ENV,
+        log_level=settings.APP_LOG_LEVEL,
+    )
+
+    asyncio.run(main_async(args))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
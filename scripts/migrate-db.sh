@@ -14,7 +14,7 @@ if [[ "$APP_COMPONENT" == "tests" ]]; then
     FULL_DB_NAME="${DB_NAME}_test"
 fi
 
-DB_DSN="${DB_DRIVER}://${DB_USER}:${DB_PASS}@tcp(${DB_HOST}:${DB_PORT})/${FULL_DB_NAME}?x-migrations-table=${MIGRATIONS_SCHEMA_TABLE}&tls=${DB_USE_SSL}"
+DB_DSN="${DB_DRIVER}://${DB_USER}:${DB_PASS}@tcp(${DB_HOST}:${DB_PORT})/${FULL_DB_NAME}?x-migrations-table=${MIGRATIONS_SCHEMA_TABLE}&tls=${DB_USE_SSL}&multiStatements=true"
 
 case "$1" in
     up)
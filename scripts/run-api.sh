@@ -6,15 +6,5 @@ if [ -z "$APP_ENV" ]; then
   exit 1
 fi
 
-if [ "$APP_ENV" == "local" ]; then
-  EXTRA_PARAMS="--reload"
-else
-  EXTRA_PARAMS=""
-fi
-
-exec uvicorn \
-    --host $APP_HOST \
-    --port $APP_INTERNAL_PORT \
-    --no-access-log \
-    $EXTRA_PARAMS \
-    app.api_boot:app
+# host, port & reloading (when APP_ENV is local) are read from the environment
+exec python -m app.run_api